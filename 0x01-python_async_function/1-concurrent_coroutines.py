@@ -5,6 +5,8 @@ This module defines an asynchronous coroutine that spawns
 collecting the delays in an ascending order.
 """
 
+import asyncio
+import heapq
 from typing import List
 wait_random = __import__('0-basic_async_syntax').wait_random
 
@@ -13,8 +15,10 @@ async def wait_n(n: int, max_delay: int) -> List[float]:
     """
     Asynchronous coroutine that spawns `wait_random`
     n times with the specified max_delay.
-    The delays are returned in ascending order without
-    using the `sort()` function.
+    All n coroutines run concurrently, so the total runtime is
+    the longest delay rather than the sum of them. Delays are
+    collected in completion order and returned in ascending
+    order without using the `sort()` function.
 
     Args:
         n (int): The number of times to spawn `wait_random`.
@@ -28,13 +32,10 @@ async def wait_n(n: int, max_delay: int) -> List[float]:
         print(delays)  # Output: [0.34, 2.75, 3.91, 5.22, 9.01]
     """
     delays = []
-    for _ in range(n):
-        delay = await wait_random(max_delay)
-        # Insert the delay in ascending order
-        # by placing it in the correct position
-        i = 0
-        while i < len(delays) and delay > delays[i]:
-            i += 1
-        delays.insert(i, delay)
+    coroutines = [wait_random(max_delay) for _ in range(n)]
+    for next_done in asyncio.as_completed(coroutines):
+        # Keep the delays in a min-heap: O(log n) per delay
+        heapq.heappush(delays, await next_done)
 
-    return delays
+    # Pop them smallest first to get ascending order
+    return [heapq.heappop(delays) for _ in range(n)]
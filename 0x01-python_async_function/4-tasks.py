@@ -6,6 +6,7 @@ the delays in ascending order.
 """
 
 import asyncio
+import heapq
 from typing import List
 task_wait_random = __import__('3-tasks').task_wait_random
 
@@ -34,12 +35,7 @@ async def task_wait_n(n: int, max_delay: int) -> List[float]:
     # Use asyncio.gather to run all tasks concurrently and get their results
     delays = await asyncio.gather(*tasks)
 
-    # Return delays in ascending order (we don't use sort)
-    ordered_delays = []
-    for delay in delays:
-        i = 0
-        while i < len(ordered_delays) and delay > ordered_delays[i]:
-            i += 1
-        ordered_delays.insert(i, delay)
-
-    return ordered_delays
+    # Return delays in ascending order (we don't use sort):
+    # heapify is O(n), then each pop is O(log n)
+    heapq.heapify(delays)
+    return [heapq.heappop(delays) for _ in range(n)]
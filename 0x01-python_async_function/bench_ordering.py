@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ordering cost of wait_n and task_wait_n for n = 10..1e6.
+
+wait_random is swapped for a coroutine returning a random delay
+without sleeping, so only scheduling and ordering are timed. The
+per-delay cost stays flat as n grows, while the old linear-scan
+insertion (timed for reference up to 20000 delays) grows with n.
+
+Usage: ./bench_ordering.py [max_n]
+"""
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, List
+
+concurrent_coroutines = __import__('1-concurrent_coroutines')
+tasks = __import__('4-tasks')
+basic_tasks = __import__('3-tasks')
+
+LINEAR_MAX_N = 20000
+
+
+async def instant_random(max_delay: int = 10) -> float:
+    """
+    wait_random without the wait.
+
+    Args:
+        max_delay (int): The maximum delay to return.
+
+    Returns:
+        float: A random delay between 0 and max_delay.
+    """
+    return random.uniform(0, max_delay)
+
+
+def linear_insert(delays: List[float]) -> List[float]:
+    """
+    Order delays the way wait_n used to: linear scan plus insert.
+
+    Args:
+        delays (List[float]): The delays in arrival order.
+
+    Returns:
+        List[float]: The delays in ascending order.
+    """
+    ordered = []
+    for delay in delays:
+        i = 0
+        while i < len(ordered) and delay > ordered[i]:
+            i += 1
+        ordered.insert(i, delay)
+    return ordered
+
+
+def per_delay(run: Callable[[], object], n: int) -> float:
+    """
+    Time one call of run.
+
+    Args:
+        run (Callable): The work to time.
+        n (int): The number of delays it handles.
+
+    Returns:
+        float: Microseconds per delay.
+    """
+    start = time.perf_counter()
+    run()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(max_n: int = 10 ** 6) -> None:
+    """
+    Print microseconds per delay for each n.
+
+    Args:
+        max_n (int): The largest n to run.
+    """
+    concurrent_coroutines.wait_random = instant_random
+    basic_tasks.wait_random = instant_random
+    print("{:>8} {:>12} {:>12} {:>14}".format(
+        "n", "wait_n", "task_wait_n", "linear insert"))
+    n = 10
+    while n <= max_n:
+        wait_n = per_delay(
+            lambda: asyncio.run(concurrent_coroutines.wait_n(n, 10)), n)
+        task_wait_n = per_delay(
+            lambda: asyncio.run(tasks.task_wait_n(n, 10)), n)
+        if n <= LINEAR_MAX_N:
+            delays = [random.uniform(0, 10) for _ in range(n)]
+            linear = "{:12.2f}us".format(
+                per_delay(lambda: linear_insert(delays), n))
+        else:
+            linear = "-"
+        print("{:>8} {:10.2f}us {:10.2f}us {:>14}".format(
+            n, wait_n, task_wait_n, linear))
+        n *= 10
+
+
+if __name__ == "__main__":
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 6)
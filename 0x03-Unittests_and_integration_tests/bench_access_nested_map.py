@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Microbenchmark access_nested_map against compiled path accessors.
+Usage: ./bench_access_nested_map.py [calls]
+"""
+import sys
+import timeit
+
+from fixtures import TEST_PAYLOAD
+from utils import access_nested_map, compile_path
+
+PATHS = [("name",), ("license", "key"), ("owner", "login")]
+
+
+def _has(repo, path) -> bool:
+    """Whether path resolves in repo"""
+    try:
+        access_nested_map(repo, path)
+    except KeyError:
+        return False
+    return True
+
+
+def main(n: int = 200000) -> None:
+    """Time n lookups of each path over the fixture repos"""
+    repos = TEST_PAYLOAD[0][1]
+    for path in PATHS:
+        present = [r for r in repos if _has(r, path)]
+        calls = n // len(present)
+        accessor = compile_path(path)
+        plain = timeit.timeit(
+            lambda: [access_nested_map(r, path) for r in present],
+            number=calls)
+        compiled = timeit.timeit(
+            lambda: [accessor(r) for r in present], number=calls)
+        print("{:<16} access_nested_map {:6.0f} ns  compiled {:6.0f} ns"
+              "  ({:.1f}x)".format(
+                  ".".join(path), plain / n * 1e9, compiled / n * 1e9,
+                  plain / compiled))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
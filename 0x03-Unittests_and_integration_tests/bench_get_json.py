@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Benchmark pooled vs. unpooled get_json against the local stub server.
+Usage: ./bench_get_json.py [requests]
+"""
+import sys
+import time
+from typing import Callable
+
+import requests
+
+from stub_server import GithubStub
+from utils import get_json, make_session
+
+
+def rate(fetch: Callable[[str], object], url: str, n: int) -> float:
+    """Return requests/sec for `n` sequential fetches of `url`"""
+    start = time.perf_counter()
+    for _ in range(n):
+        fetch(url)
+    return n / (time.perf_counter() - start)
+
+
+def main(n: int = 500) -> None:
+    """Run both modes and print requests/sec"""
+    session = make_session()
+    with GithubStub() as stub:
+        url = stub.org_url.format(org="google")
+        try:
+            unpooled = rate(lambda u: requests.get(u).json(), url, n)
+            pooled = rate(lambda u: get_json(u, session=session), url, n)
+        finally:
+            session.close()
+    print("unpooled: {:8.1f} req/s".format(unpooled))
+    print("pooled:   {:8.1f} req/s ({:.1f}x)".format(
+        pooled, pooled / unpooled))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Measure memory held per 10k repos as payload dicts vs. Repo records.
+Usage: ./bench_repo_memory.py [repos]
+"""
+import copy
+import json
+import sys
+import tracemalloc
+from typing import Any, Callable, List
+
+from client import Repo
+from fixtures import TEST_PAYLOAD
+
+
+def held(build: Callable[[], List[Any]]) -> int:
+    """Bytes still allocated by the list build() returns"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main(n: int = 10000) -> None:
+    """Decode n fixture repos and report memory per representation"""
+    repos = TEST_PAYLOAD[0][1]
+    raw = json.dumps([dict(copy.deepcopy(repos[i % len(repos)]),
+                           name="repo{}".format(i)) for i in range(n)])
+    extra = Repo.with_fields(("stargazers_count", "language"))
+    builds = [
+        ("dict", lambda: json.loads(raw)),
+        ("Repo", lambda: [Repo.from_dict(r) for r in json.loads(raw)]),
+        ("Repo+2 extra", lambda: [extra.from_dict(r)
+                                  for r in json.loads(raw)]),
+    ]
+    for label, build in builds:
+        size = held(build)
+        print("{:<14} {:10.1f} KiB per 10k repos ({} bytes/repo)".format(
+            label, size / n * 10000 / 1024, size // n))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
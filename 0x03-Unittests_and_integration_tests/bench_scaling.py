@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Throughput and memory of the client hot paths on synthetic orgs.
+Prints figures for a quick look; the ns/op and peak allocation tracked
+across commits are saved by benchmarks.py.
+Usage: ./bench_scaling.py [repos ...]   (default: 10 10000 100000)
+"""
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+from unittest.mock import patch
+
+from client import GithubOrgClient
+from fixture_generator import generate_payload
+from utils import access_nested_map
+
+
+def timed(fn: Callable[[], object]) -> Tuple[float, int]:
+    """Seconds taken by fn, and peak bytes it allocates in a second,
+    traced run.
+    """
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(n: int) -> None:
+    """Report every hot path for an org with n repos"""
+    org, repos, _, _ = generate_payload(n)
+
+    def client() -> GithubOrgClient:
+        return GithubOrgClient("google")
+
+    cases = {
+        "access_nested_map": lambda: [
+            access_nested_map(r, ("owner", "login")) for r in repos],
+        "has_license": lambda: [
+            GithubOrgClient.has_license(r, "apache-2.0") for r in repos],
+        "public_repos": lambda: client().public_repos(),
+        "public_repos(license)": lambda: client().public_repos(
+            "apache-2.0"),
+    }
+    with patch("client.get_json", return_value=org), \
+            patch("client.get_json_pages", side_effect=lambda *a, **k:
+                  iter([repos])):
+        for label, case in cases.items():
+            elapsed, peak = timed(case)
+            print("{:>8} repos  {:<22} {:12.0f} repos/s  peak {:8.1f} KiB"
+                  .format(n, label, n / elapsed, peak / 1024))
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [10, 10000, 100000]:
+        run(size)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the GithubOrgClient hot paths.
+Benchmarks run interleaved: every round times each benchmark and a fixed
+pure-Python calibration loop once, for at least 0.2s each. Each benchmark
+reports the median ns/op over the rounds, and its median ratio to the
+calibration loop of the same round, with the spread (median absolute
+deviation over median) of those ratios. Baselines compare the ratios, so
+a baseline saved on one machine stays meaningful on another. A benchmark
+is flagged when it slowed by more than the threshold plus a noise
+allowance of NOISE times the larger spread of the two runs, capped at
+the threshold itself: a slowdown of twice the threshold (50% by default)
+is always caught, and one just over the threshold only when both runs
+were quiet (spread under threshold / NOISE). The limit used for each
+benchmark is printed next to its change.
+Benchmarks over generated payloads also record the peak bytes one call
+allocates, traced with tracemalloc after timing. Allocation is nearly
+deterministic, so a peak above the baseline's by more than
+--memory-threshold (10% by default) is flagged too.
+Usage:
+    ./benchmarks.py [-k NAME] [--json OUT]
+    ./benchmarks.py --save-baseline benchmarks_baseline.json
+    ./benchmarks.py --baseline benchmarks_baseline.json [--threshold 0.25]
+        [--memory-threshold 0.1]
+The last form exits with status 1 if any benchmark regressed.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from client import GithubOrgClient
+from fixture_generator import generate_payload
+from stub_server import GithubStub
+from utils import access_nested_map, compile_path, get_json, make_session
+from utils import memoize, prime
+
+REPOS = 1000
+LICENSE = "apache-2.0"
+MIN_TIME = 0.2
+NOISE = 3
+Benchmark = Callable[[], Iterator[Tuple[Callable[[], object], int]]]
+BENCHMARKS: Dict[str, Benchmark] = {}
+MEMORY: Set[str] = set()
+
+
+def benchmark(fn: Optional[Benchmark] = None, *,
+              memory: bool = False) -> Callable:
+    """Register a benchmark. It yields `(callable, ops per call)` once
+    set up, and may clean up after the yield. With `memory`, the peak
+    allocation of one call is recorded as well.
+    Example
+    -------
+    >>> @benchmark(memory=True)
+    ... def build() -> Iterator:
+    ...     yield lambda: list(range(1000)), 1000
+    """
+    def register(fn: Benchmark) -> Benchmark:
+        BENCHMARKS[fn.__name__] = fn
+        if memory:
+            MEMORY.add(fn.__name__)
+        return fn
+
+    return register if fn is None else register(fn)
+
+
+def _client(repos: List[Dict]) -> GithubOrgClient:
+    """A client whose repos payload is already cached"""
+    client = GithubOrgClient("google")
+    prime(client, "repos_payload", repos)
+    return client
+
+
+class _Memoized:
+    """Holder of memoized properties"""
+
+    @memoize
+    def plain(self) -> int:
+        """Plain memoize"""
+        return 42
+
+    @memoize(single_flight=True)
+    def single_flight(self) -> int:
+        """Single-flight memoize"""
+        return 42
+
+
+@benchmark(memory=True)
+def access_nested_map_path() -> Iterator:
+    """access_nested_map of a two-key path"""
+    repos = generate_payload(REPOS)[1]
+    path = ("owner", "login")
+    yield lambda: [access_nested_map(r, path) for r in repos], REPOS
+
+
+@benchmark(memory=True)
+def compile_path_accessor() -> Iterator:
+    """Precompiled accessor of a two-key path"""
+    repos = generate_payload(REPOS)[1]
+    accessor = compile_path(("owner", "login"))
+    yield lambda: [accessor(r) for r in repos], REPOS
+
+
+@benchmark
+def memoize_cold() -> Iterator:
+    """First access of a memoized property"""
+    yield lambda: _Memoized().plain, 1
+
+
+@benchmark
+def memoize_warm() -> Iterator:
+    """Cached access of a memoized property"""
+    obj = _Memoized()
+    obj.plain
+    yield lambda: obj.plain, 1
+
+
+@benchmark
+def memoize_single_flight_cold() -> Iterator:
+    """First access of a single-flight memoized property"""
+    yield lambda: _Memoized().single_flight, 1
+
+
+@benchmark
+def memoize_single_flight_warm() -> Iterator:
+    """Cached access of a single-flight memoized property"""
+    obj = _Memoized()
+    obj.single_flight
+    yield lambda: obj.single_flight, 1
+
+
+@benchmark(memory=True)
+def has_license() -> Iterator:
+    """has_license over every repo"""
+    repos = generate_payload(REPOS)[1]
+    check = GithubOrgClient.has_license
+    yield lambda: [check(r, LICENSE) for r in repos], REPOS
+
+
+@benchmark(memory=True)
+def public_repos() -> Iterator:
+    """public_repos without a license filter"""
+    client = _client(generate_payload(REPOS)[1])
+    yield client.public_repos, REPOS
+
+
+@benchmark(memory=True)
+def public_repos_license_cold() -> Iterator:
+    """public_repos(license) on a new client, building the index"""
+    repos = generate_payload(REPOS)[1]
+    yield lambda: _client(repos).public_repos(LICENSE), REPOS
+
+
+@benchmark(memory=True)
+def public_repos_license_warm() -> Iterator:
+    """public_repos(license) once the index is built"""
+    client = _client(generate_payload(REPOS)[1])
+    client.public_repos(LICENSE)
+    yield lambda: client.public_repos(LICENSE), REPOS
+
+
+@benchmark
+def get_json_local() -> Iterator:
+    """get_json of an org over keep-alive HTTP to the stub server"""
+    session = make_session()
+    with GithubStub() as stub:
+        url = stub.org_url.format(org="google")
+        yield lambda: get_json(url, session=session), 1
+    session.close()
+
+
+def _loop() -> None:
+    """Fixed pure-Python workload used for calibration"""
+    d: Dict[int, int] = {}
+    for i in range(1000):
+        d[i & 7] = i
+
+
+def _number(timer: timeit.Timer) -> int:
+    """Loops per sample so that one sample takes at least MIN_TIME"""
+    number, elapsed = timer.autorange()
+    return max(1, int(number * MIN_TIME / elapsed) + 1)
+
+
+def _spread(samples: List[float]) -> float:
+    """Median absolute deviation relative to the median"""
+    median = statistics.median(samples)
+    return statistics.median(abs(x - median) for x in samples) / median
+
+
+def _peak(fn: Callable[[], object]) -> int:
+    """Peak bytes allocated by one call of fn"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _steps(stack: ExitStack, name: str) -> Tuple[Callable, int]:
+    """Set up a benchmark, cleaning it up when `stack` closes"""
+    steps = BENCHMARKS[name]()
+    fn, ops = next(steps)
+    stack.callback(next, steps, None)
+    return fn, ops
+
+
+def run(names: List[str], repeat: int) -> Dict:
+    """Run the named benchmarks interleaved and return the report"""
+    with ExitStack() as stack:
+        setups = {name: _steps(stack, name) for name in names}
+        setups[""] = (_loop, 1000)
+        timers = {name: (timeit.Timer(fn), ops)
+                  for name, (fn, ops) in setups.items()}
+        numbers = {name: _number(timer)
+                   for name, (timer, _ops) in timers.items()}
+        samples: Dict[str, List[float]] = {name: [] for name in timers}
+        for _ in range(repeat):
+            for name, (timer, ops) in timers.items():
+                number = numbers[name]
+                seconds = timer.timeit(number)
+                samples[name].append(seconds / number / ops * 1e9)
+        peaks = {name: _peak(setups[name][0])
+                 for name in names if name in MEMORY}
+    calibration = samples.pop("")
+    results = {}
+    for name, ns in samples.items():
+        ratios = [x / c for x, c in zip(ns, calibration)]
+        results[name] = {
+            "ns_per_op": round(statistics.median(ns), 2),
+            "relative": round(statistics.median(ratios), 4),
+            "spread": round(_spread(ratios), 4),
+        }
+        line = "{:<28} {:12.1f} ns/op  +-{:5.1%}".format(
+            name, results[name]["ns_per_op"], results[name]["spread"])
+        if name in peaks:
+            results[name]["peak_bytes"] = peaks[name]
+            line += "  peak {:10.1f} KiB".format(peaks[name] / 1024)
+        print(line)
+    return {"python": platform.python_version(),
+            "calibration_ns": round(statistics.median(calibration), 3),
+            "calibration_spread": round(_spread(calibration), 4),
+            "repeat": repeat,
+            "results": results}
+
+
+def regressions(report: Dict, baseline: Dict, threshold: float,
+                memory_threshold: float = 0.1) -> List[str]:
+    """Names of benchmarks slower than baseline beyond threshold plus
+    the noise allowance (at most threshold again), or whose peak
+    allocation grew by more than memory_threshold
+    """
+    slower = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = result["relative"] / base["relative"] - 1
+        noise = NOISE * max(result["spread"], base.get("spread", 0))
+        limit = threshold + min(noise, threshold)
+        flag = "REGRESSION" if change > limit else ""
+        print("{:<28} {:+8.1%} (limit {:+.1%}) {}".format(
+            name, change, limit, flag))
+        if change > limit:
+            slower.append(name)
+        if "peak_bytes" in result and "peak_bytes" in base:
+            growth = result["peak_bytes"] / base["peak_bytes"] - 1
+            flag = "REGRESSION" if growth > memory_threshold else ""
+            print("{:<28} {:+8.1%} peak (limit {:+.1%}) {}".format(
+                "", growth, memory_threshold, flag))
+            if growth > memory_threshold and name not in slower:
+                slower.append(name)
+    return slower
+
+
+def main() -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="match", default="",
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--save-baseline", help="write the report here too")
+    parser.add_argument("--baseline", help="compare against this report")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.match in name]
+    report = run(names, args.repeat)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        if regressions(report, baseline, args.threshold,
+                       args.memory_threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,785 @@
 #!/usr/bin/env python3
 """A github org client
 """
+import json
+import operator
+import sqlite3
+import threading
+import time
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from functools import lru_cache
+from heapq import nlargest, nsmallest
+from itertools import takewhile
+from urllib.parse import urlencode, urlsplit
 from typing import (
+    Any,
+    Callable,
     List,
     Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
 )
 
+import requests
+
 from utils import (
+    BACKGROUND,
     get_json,
+    get_json_pages,
+    get_json_stream,
     access_nested_map,
+    async_get_json,
+    async_get_json_pages,
+    async_memoize,
+    extract_columns,
+    invalidate,
+    is_cached,
+    make_session,
     memoize,
+    post_json,
+    prime,
+    project,
+    request_priority,
 )
 
 
+class Repo(Mapping):
+    """Compact, read-only record of a repo payload.
+    Only `name`, the license key and the class's `EXTRA_FIELDS` are
+    kept, in slots. It still reads like the payload it came from:
+    `repo["name"]` and `access_nested_map(repo, ("license", "key"))`
+    work, so has_license and public_repos accept it unchanged. Use
+    `Repo.with_fields` for a record type keeping more top-level keys.
+    """
+    __slots__ = ("name", "license_key")
+    EXTRA_FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, name: str, license_key: Optional[str] = None,
+                 **extra: Any) -> None:
+        """Init method of Repo"""
+        self.name = name
+        self.license_key = license_key
+        for field in self.EXTRA_FIELDS:
+            setattr(self, field, extra.get(field))
+
+    @classmethod
+    def from_dict(cls, repo: Dict) -> "Repo":
+        """Build a record from a repo payload"""
+        try:
+            license_key = access_nested_map(repo, ("license", "key"))
+        except KeyError:
+            license_key = None
+        return cls(repo["name"], license_key,
+                   **{field: repo.get(field) for field in cls.EXTRA_FIELDS})
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def with_fields(extra_fields: Tuple[str, ...]) -> type:
+        """Record type also keeping the given top-level payload keys"""
+        if not extra_fields:
+            return Repo
+        return type("Repo", (Repo,), {
+            "__slots__": extra_fields,
+            "EXTRA_FIELDS": extra_fields,
+        })
+
+    def __getitem__(self, key: str) -> Any:
+        """Payload-style access"""
+        if key == "name":
+            return self.name
+        if key == "license":
+            if self.license_key is None:
+                return None
+            return {"key": self.license_key}
+        if key in self.EXTRA_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the kept payload keys"""
+        yield "name"
+        yield "license"
+        yield from self.EXTRA_FIELDS
+
+    def __len__(self) -> int:
+        """Number of kept payload keys"""
+        return 2 + len(self.EXTRA_FIELDS)
+
+    def __repr__(self) -> str:
+        """Repr method of Repo"""
+        return "Repo({!r})".format(dict(self))
+
+    def __reduce__(self) -> Tuple:
+        """Pickle support for types built by with_fields"""
+        return (_make_repo, (self.EXTRA_FIELDS, self.name, self.license_key,
+                             {f: getattr(self, f) for f in self.EXTRA_FIELDS}))
+
+
+def _make_repo(extra_fields: Tuple[str, ...], name: str,
+               license_key: Optional[str], extra: Dict) -> Repo:
+    """Unpickle a Repo"""
+    return Repo.with_fields(extra_fields)(name, license_key, **extra)
+
+
+Field = Union[str, Sequence[str]]
+Predicate = Tuple[Field, str, Any]
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, values: value in values,
+    "not in": lambda value, values: value not in values,
+}
+
+
+def _path(field: Field) -> Tuple[str, ...]:
+    """Key path of a field given as "license.key" or a sequence"""
+    return tuple(field.split(".")) if isinstance(field, str) \
+        else tuple(field)
+
+
+def _test(op: str, operand: Any) -> Callable[[Any], bool]:
+    """Predicate on one column value. Ordering comparisons are false
+    for missing (None) values instead of raising.
+    """
+    try:
+        compare = _OPERATORS[op]
+    except KeyError:
+        raise ValueError("Unknown operator: {!r}".format(op)) from None
+    if op in ("in", "not in"):
+        operand = frozenset(operand)
+    if op in ("==", "!=", "in", "not in"):
+        return lambda value: compare(value, operand)
+    return lambda value: value is not None and compare(value, operand)
+
+
+class RepoTable:
+    """Columnar, read-only view of repo payloads for ad-hoc queries.
+    Columns are pulled out of the records with `extract_columns` the
+    first time a query touches them and kept, so later queries only
+    scan the columns they use. Fields are key paths, written either as
+    "license.key" or as ("license", "key"); missing values are None.
+    Example
+    -------
+    >>> table = client.table
+    >>> table.select(where=[("stargazers_count", ">", 100),
+    ...                     ("fork", "==", False)],
+    ...              fields=["name", "language"],
+    ...              order_by="-stargazers_count", limit=10)
+    >>> table.count_by("license.key")
+    {'apache-2.0': 4, None: 3, ...}
+    """
+
+    def __init__(self, records: Sequence[Mapping]) -> None:
+        """Init method of RepoTable"""
+        self._records = records
+        self._columns: Dict[Tuple[str, ...], List] = {}
+
+    @classmethod
+    def concat(cls, tables: Iterable["RepoTable"]) -> "RepoTable":
+        """One table holding the rows of every table, in order"""
+        tables = list(tables)
+        table = cls([record for t in tables for record in t._records])
+        shared = set.intersection(*(set(t._columns) for t in tables)) \
+            if tables else set()
+        for path in shared:
+            table._columns[path] = [value for t in tables
+                                    for value in t._columns[path]]
+        return table
+
+    def __len__(self) -> int:
+        """Number of rows"""
+        return len(self._records)
+
+    def column(self, field: Field) -> List:
+        """All values of field, one per row"""
+        path = _path(field)
+        column = self._columns.get(path)
+        if column is None:
+            column = self._columns[path] = \
+                extract_columns(self._records, [path])[path]
+        return column
+
+    def rows(self, where: Iterable[Predicate] = ()) -> List[int]:
+        """Indexes of the rows matching every `(field, op, operand)`
+        predicate; op is one of ==, !=, <, <=, >, >=, in, not in.
+        """
+        indexes: Optional[List[int]] = None
+        for field, op, operand in where:
+            test, column = _test(op, operand), self.column(field)
+            if indexes is None:
+                indexes = [i for i, value in enumerate(column)
+                           if test(value)]
+            else:
+                indexes = [i for i in indexes if test(column[i])]
+        return list(range(len(self))) if indexes is None else indexes
+
+    def select(self, where: Iterable[Predicate] = (),
+               fields: Sequence[Field] = ("name",),
+               order_by: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rows matching where, as dicts of fields keyed as given.
+        `order_by` is a field, prefixed with "-" for descending order;
+        missing values sort last either way and ties keep payload
+        order. With `limit`, only the top rows are ranked.
+        """
+        indexes = self.rows(where)
+        if order_by is not None:
+            descending = order_by.startswith("-")
+            keys = self.column(order_by.lstrip("-"))
+            if descending:
+                def key(i: int) -> Tuple:
+                    return (keys[i] is not None, keys[i])
+            else:
+                def key(i: int) -> Tuple:
+                    return (keys[i] is None, keys[i])
+            if limit is not None and limit < len(indexes):
+                indexes = (nlargest if descending else nsmallest)(
+                    limit, indexes, key=key)
+            else:
+                indexes.sort(key=key, reverse=descending)
+        if limit is not None:
+            indexes = indexes[:limit]
+        names = [field if isinstance(field, str) else ".".join(field)
+                 for field in fields]
+        columns = [self.column(field) for field in fields]
+        return [{name: column[i] for name, column in zip(names, columns)}
+                for i in indexes]
+
+    def count_by(self, field: Field,
+                 where: Iterable[Predicate] = ()) -> Dict[Any, int]:
+        """Number of matching rows per value of field, most common
+        first.
+        """
+        column = self.column(field)
+        if not where:
+            counts = Counter(column)
+        else:
+            counts = Counter(column[i] for i in self.rows(where))
+        return dict(counts.most_common())
+
+
+class SnapshotStore:
+    """SQLite store of the latest org and repos payloads per org.
+    Each payload is saved as JSON with the time it was fetched, so a
+    restarted worker can warm-start its clients instead of fetching
+    every org again. Repo records are saved as their payload form.
+    Example
+    -------
+    >>> store = SnapshotStore("snapshots.db")
+    >>> client = GithubOrgClient("google", store=store)
+    >>> client.warm_start()
+    True
+    """
+
+    def __init__(self, path: str) -> None:
+        """Init method of SnapshotStore"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " org TEXT NOT NULL, kind TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL, payload TEXT NOT NULL,"
+                " PRIMARY KEY (org, kind))")
+
+    def save(self, org: str, kind: str, payload: Any,
+             fetched_at: Optional[float] = None) -> None:
+        """Replace the `kind` ("org" or "repos") snapshot of org"""
+        data = json.dumps(payload, default=dict, separators=(",", ":"))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (org, kind, time.time() if fetched_at is None
+                 else fetched_at, data))
+
+    def load(self, org: str, kind: str) -> Optional[Tuple[Any, float]]:
+        """Return `(payload, fetched_at)` for the snapshot, if any"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, fetched_at FROM snapshots"
+                " WHERE org = ? AND kind = ?", (org, kind)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._db.close()
+
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+GRAPHQL_FIELDS: Dict[Tuple[str, ...], Tuple[str, ...]] = {
+    ("name",): ("name",),
+    ("full_name",): ("nameWithOwner",),
+    ("description",): ("description",),
+    ("html_url",): ("url",),
+    ("homepage",): ("homepageUrl",),
+    ("license", "key"): ("licenseInfo", "key"),
+    ("license", "name"): ("licenseInfo", "name"),
+    ("license", "spdx_id"): ("licenseInfo", "spdxId"),
+    ("language",): ("primaryLanguage", "name"),
+    ("fork",): ("isFork",),
+    ("private",): ("isPrivate",),
+    ("archived",): ("isArchived",),
+    ("stargazers_count",): ("stargazerCount",),
+    ("forks_count",): ("forkCount",),
+    ("created_at",): ("createdAt",),
+    ("updated_at",): ("updatedAt",),
+    ("pushed_at",): ("pushedAt",),
+}
+DEFAULT_FIELDS: Tuple[Tuple[str, ...], ...] = (("name",), ("license", "key"))
+
+
+class GraphQLError(RuntimeError):
+    """The GraphQL endpoint answered with errors"""
+
+    def __init__(self, errors: List[Dict]) -> None:
+        """Init method of GraphQLError"""
+        super().__init__("; ".join(
+            error.get("message", str(error)) for error in errors))
+        self.errors = errors
+
+
+class HTTPTransport:
+    """Sends GraphQL queries to an HTTP endpoint with post_json, so
+    sessions, rate limiting and instrumentation apply as for REST.
+    Any callable taking `(query, variables)` and returning the `data`
+    of the reply can stand in for it.
+    """
+
+    def __init__(self, url: str = GRAPHQL_URL,
+                 session: Optional[requests.Session] = None,
+                 token: Optional[str] = None) -> None:
+        """Init method of HTTPTransport"""
+        self.url = url
+        self.session = session
+        self.headers = {"Authorization": "bearer " + token} if token else {}
+
+    def __call__(self, query: str, variables: Dict) -> Dict:
+        """Run query and return its data"""
+        reply = post_json(self.url, {"query": query, "variables": variables},
+                          session=self.session, headers=self.headers)
+        if reply.get("errors"):
+            raise GraphQLError(reply["errors"])
+        return reply["data"]
+
+
+@lru_cache(maxsize=None)
+def graphql_query(fields: Tuple[Tuple[str, ...], ...]) -> str:
+    """GraphQL query for one page of an org's repos, selecting only the
+    GraphQL counterparts of the REST key paths in fields.
+    """
+    tree: Dict[str, Dict] = {}
+    for field in fields:
+        try:
+            path = GRAPHQL_FIELDS[tuple(field)]
+        except KeyError:
+            raise ValueError("No GraphQL field for {}".format(
+                ".".join(field))) from None
+        node = tree
+        for key in path:
+            node = node.setdefault(key, {})
+
+    def selection(node: Dict) -> str:
+        return " ".join(key + (" { " + selection(child) + " }"
+                               if child else "")
+                        for key, child in node.items())
+
+    return ("query($org: String!, $first: Int!, $after: String) {"
+            " organization(login: $org) {"
+            " repositories(first: $first, after: $after) {"
+            " pageInfo { hasNextPage endCursor }"
+            " nodes { " + selection(tree) + " } } } }")
+
+
+def _from_node(node: Dict, fields: Sequence[Tuple[str, ...]]) -> Dict:
+    """REST-shaped repo payload holding fields of a GraphQL node.
+    A null object on the GraphQL side, such as `licenseInfo`, becomes
+    a null top-level key, such as `license`, as in the REST API.
+    """
+    repo: Dict[str, Any] = {}
+    for field in fields:
+        path = GRAPHQL_FIELDS[field]
+        value: Any = node
+        for key in path[:-1]:
+            value = value.get(key)
+            if value is None:
+                repo[field[0]] = None
+                break
+        else:
+            target = repo
+            for key in field[:-1]:
+                target = target.setdefault(key, {})
+            target[field[-1]] = value.get(path[-1])
+    return repo
+
+
+class GraphQLBackend:
+    """Projection-capable repos source over the GraphQL API.
+    Only the requested fields are fetched, transferred and kept; repos
+    come back as REST-shaped payloads holding just those keys, with
+    a null license or language as `None` like the REST API. Supported
+    key paths are those in `GRAPHQL_FIELDS`.
+    Example
+    -------
+    >>> backend = GraphQLBackend(HTTPTransport(token=TOKEN))
+    >>> client = GithubOrgClient("google", backend=backend)
+    >>> client.public_repos("apache-2.0")
+    """
+
+    def __init__(self, transport: Optional[Callable[[str, Dict], Dict]]
+                 = None, page_size: int = 100) -> None:
+        """Init method of GraphQLBackend"""
+        self.transport = transport or HTTPTransport()
+        self.page_size = page_size
+
+    def iter_repos(self, org: str,
+                   fields: Sequence[Sequence[str]] = DEFAULT_FIELDS,
+                   ) -> Iterator[Dict]:
+        """Yield the repos of org page by page"""
+        fields = tuple(tuple(field) for field in fields)
+        query = graphql_query(fields)
+        cursor = None
+        while True:
+            data = self.transport(query, {"org": org,
+                                          "first": self.page_size,
+                                          "after": cursor})
+            if data.get("organization") is None:
+                raise GraphQLError([{"message": "Could not resolve to an "
+                                     "Organization with the login of "
+                                     "'{}'.".format(org)}])
+            repos = data["organization"]["repositories"]
+            for node in repos["nodes"]:
+                yield _from_node(node, fields)
+            page_info = repos["pageInfo"]
+            if not page_info["hasNextPage"]:
+                return
+            cursor = page_info["endCursor"]
+
+
 class GithubOrgClient:
     """A Githib org client
     """
     ORG_URL = "https://api.github.com/orgs/{org}"
+    SYNC_SORT = ("updated", "updated_at")
 
-    def __init__(self, org_name: str) -> None:
-        """Init method of GithubOrgClient"""
+    def __init__(self, org_name: str, prefetch: int = 0,
+                 session: Optional[requests.Session] = None,
+                 repos_ttl: Optional[float] = None,
+                 stream: bool = False,
+                 fields: Optional[Sequence[Sequence]] = None,
+                 compact: bool = False,
+                 extra_fields: Sequence[str] = (),
+                 store: Optional[SnapshotStore] = None,
+                 backend: Optional[GraphQLBackend] = None) -> None:
+        """Init method of GithubOrgClient
+        `prefetch` is how many repo pages may be fetched concurrently,
+        `session` overrides the process-wide session of get_json and
+        `repos_ttl` is how many seconds repos_payload stays cached.
+        With `stream`, repos are parsed one at a time as they download,
+        keeping only the key paths in `fields` when given.
+        With `compact`, repos are kept as slotted `Repo` records holding
+        the name, license key and `extra_fields`.
+        Fetched payloads are saved to `store`, see `warm_start`.
+        With a projection `backend`, repos are fetched from it instead
+        of the REST API, requesting only `fields` (the name and license
+        key by default), and the org payload is not needed for them.
+        """
         self._org_name = org_name
+        self._prefetch = prefetch
+        self._session = session
+        self._repos_ttl = repos_ttl
+        self._stream = stream
+        self._fields = fields
+        self._repo_type = Repo.with_fields(tuple(extra_fields)) \
+            if compact else None
+        self._store = store
+        self._backend = backend
+        self._watermark: Optional[str] = None
+        self._repos_fetched = False
 
-    @memoize
+    @memoize(single_flight=True)
     def org(self) -> Dict:
         """Memoize org"""
-        return get_json(self.ORG_URL.format(org=self._org_name))
+        org = get_json(self.ORG_URL.format(org=self._org_name),
+                       session=self._session)
+        self._snapshot("org", org)
+        return org
 
     @property
     def _public_repos_url(self) -> str:
         """Public repos URL"""
         return self.org["repos_url"]
 
-    @memoize
-    def repos_payload(self) -> Dict:
-        """Memoize repos payload"""
-        return get_json(self._public_repos_url)
+    @memoize(single_flight=True, ttl=lambda self: self._repos_ttl)
+    def repos_payload(self) -> List[Dict]:
+        """Memoize repos payload, across all pages"""
+        mark: List[Optional[str]] = [None]
+        repos = list(self._fetch_repos(
+            None if self._backend else self._public_repos_url, mark=mark))
+        self._raise_watermark(mark[0])
+        self._snapshot_repos(repos)
+        return repos
+
+    def refresh_repos(self) -> None:
+        """Drop the cached repos payload, keeping org"""
+        invalidate(self, "repos_payload")
+
+    def iter_repos(self) -> Iterator[Dict]:
+        """Yield repos page by page, reusing the payload once cached"""
+        if is_cached(self, "repos_payload"):
+            yield from self.repos_payload
+            return
+        yield from self._fetch_repos(
+            None if self._backend else self._public_repos_url)
+
+    def _fetch_repos(self, url: Optional[str], fresh: Optional[bool] = None,
+                     since: Optional[str] = None,
+                     held: Iterable[str] = (),
+                     mark: Optional[List[Optional[str]]] = None
+                     ) -> Iterator[Dict]:
+        """Yield repos from the API, ignoring any cached payload.
+        url is unused when repos come from the projection backend.
+        Only the first fetch of a client may be served from the shared
+        URL cache unless `fresh` says otherwise; refetches (after
+        refresh_repos, a TTL expiry, refresh or sync_repos) always go
+        to the server.
+        With `since`, url must list repos most recently updated first:
+        iteration stops at the first repo updated before `since`, and
+        repos updated exactly at `since` whose names are in `held` are
+        skipped as unchanged.
+        The latest update stamp seen is kept in `mark[0]`; the caller
+        raises the sync watermark to it once the repos are stored.
+        """
+        if mark is None:
+            mark = [None]
+        if fresh is None:
+            fresh = self._repos_fetched
+        self._repos_fetched = True
+        field = self.SYNC_SORT[1]
+        fields = self._fields
+        strip = self._stream and self._backend is None \
+            and fields is not None \
+            and (field,) not in [tuple(path) for path in fields]
+        if strip:
+            fields = list(fields) + [(field,)]
+        if self._backend is not None:
+            repos = self._backend.iter_repos(
+                self._org_name, self._fields or DEFAULT_FIELDS)
+        elif self._stream:
+            repos = get_json_stream(url, session=self._session,
+                                    fields=fields)
+        else:
+            pages = get_json_pages(url, session=self._session,
+                                   prefetch=self._prefetch, fresh=fresh)
+            repos = (repo for page in pages for repo in page)
+        repos = self._watch(repos, mark)
+        if since is not None:
+            held = set(held)
+            repos = (repo for repo in takewhile(
+                lambda repo: (repo.get(field) or "") >= since, repos)
+                if repo.get(field) != since or repo["name"] not in held)
+        if strip:
+            repos = (project(repo, self._fields) for repo in repos)
+        if self._repo_type is not None:
+            repos = map(self._repo_type.from_dict, repos)
+        yield from repos
+
+    def _watch(self, repos: Iterable[Dict],
+               mark: List[Optional[str]]) -> Iterator[Dict]:
+        """Pass repos through, keeping the latest update stamp in mark"""
+        field = self.SYNC_SORT[1]
+        for repo in repos:
+            stamp = repo.get(field)
+            if stamp is not None and (mark[0] is None or stamp > mark[0]):
+                mark[0] = stamp
+            yield repo
+
+    def _raise_watermark(self, stamp: Optional[str]) -> None:
+        """Move the sync watermark up to stamp"""
+        if stamp is not None and (self._watermark is None
+                                  or stamp > self._watermark):
+            self._watermark = stamp
+
+    def sync_repos(self) -> List[Dict]:
+        """Bring repos_payload up to date, fetching only what changed.
+        Repos are requested most recently updated first, and pagination
+        stops at the first repo older than the watermark left by the
+        previous fetch; the rest are merged into the cached payload by
+        name. Repos stamped exactly at the watermark are only taken if
+        they are not held yet. Without a cached payload or watermark
+        this is a full fetch, as is every sync through a projection
+        backend. Deleted repos are only dropped by a full fetch.
+        Returns the repos that changed.
+        """
+        watermark = self._watermark
+        if watermark is None or self._backend is not None \
+                or not is_cached(self, "repos_payload"):
+            invalidate(self, "repos_payload")
+            return list(self.repos_payload)
+        url = urlsplit(self._public_repos_url)
+        query = urlencode({"sort": self.SYNC_SORT[0], "direction": "desc"})
+        url = url._replace(
+            query=url.query + "&" + query if url.query else query).geturl()
+        mark: List[Optional[str]] = [None]
+        changed = list(self._fetch_repos(
+            url, fresh=True, since=watermark,
+            held=(repo["name"] for repo in self.repos_payload), mark=mark))
+        by_name = {repo["name"]: repo for repo in changed}
+        repos = [by_name.pop(repo["name"], repo)
+                 for repo in self.repos_payload]
+        prime(self, "repos_payload", repos + list(by_name.values()))
+        self._raise_watermark(mark[0])
+        self._snapshot_repos(self.repos_payload)
+        return changed
+
+    def _snapshot(self, kind: str, payload: Any) -> None:
+        """Save payload to the snapshot store, if there is one"""
+        if self._store is not None:
+            self._store.save(self._org_name, kind, payload)
+
+    def _snapshot_repos(self, repos: List[Dict]) -> None:
+        """Save repos and the sync watermark they leave"""
+        self._snapshot("repos", repos)
+        if self._watermark is not None:
+            self._snapshot("watermark", self._watermark)
+
+    def warm_start(self, max_age: Optional[float] = None,
+                   refresh: bool = True) -> bool:
+        """Seed org and repos_payload from the snapshot store.
+        Snapshots older than `max_age` seconds are ignored. With
+        `refresh`, fresh payloads are then fetched on a background
+        thread and swapped in when ready. Returns whether the snapshots
+        were loaded; with a projection backend, which never fetches org,
+        only repos are needed.
+        """
+        if self._store is None:
+            return False
+        kinds = ("repos",) if self._backend is not None else ("repos", "org")
+        snapshots = [self._store.load(self._org_name, kind)
+                     for kind in kinds]
+        if None in snapshots or (max_age is not None and any(
+                time.time() - fetched_at > max_age
+                for _, fetched_at in snapshots)):
+            return False
+        repos = snapshots[0][0]
+        if self._repo_type is not None:
+            repos = [self._repo_type.from_dict(repo) for repo in repos]
+        watermark = self._store.load(self._org_name, "watermark")
+        if watermark is not None:
+            self._watermark = watermark[0]
+        if self._backend is None:
+            prime(self, "org", snapshots[1][0])
+        prime(self, "repos_payload", repos)
+        if refresh:
+            self.refresh_in_background()
+        return True
+
+    def refresh(self) -> None:
+        """Fetch org and repos anew, then swap them in and snapshot them.
+        Cached values keep being served until the new ones are ready.
+        With a projection backend only repos are fetched.
+        """
+        org = None
+        if self._backend is None:
+            org = get_json(self.ORG_URL.format(org=self._org_name),
+                           session=self._session, fresh=True)
+        self._repos_fetched = True
+        mark: List[Optional[str]] = [None]
+        repos = list(self._fetch_repos(
+            None if org is None else org["repos_url"], mark=mark))
+        if org is not None:
+            prime(self, "org", org)
+            self._snapshot("org", org)
+        prime(self, "repos_payload", repos)
+        self._raise_watermark(mark[0])
+        self._snapshot_repos(repos)
+
+    def refresh_in_background(self) -> threading.Thread:
+        """Run `refresh` at BACKGROUND request priority on a daemon
+        thread and return the thread.
+        """
+        def refresh() -> None:
+            with request_priority(BACKGROUND):
+                self.refresh()
+
+        thread = threading.Thread(target=refresh, daemon=True,
+                                  name="refresh-{}".format(self._org_name))
+        thread.start()
+        return thread
+
+    def iter_public_repos(self, license: str = None) -> Iterator[str]:
+        """Lazily yield public repo names as pages arrive"""
+        for repo in self.iter_repos():
+            if license is None or self.has_license(repo, license):
+                yield repo["name"]
+
+    @property
+    def license_index(self) -> Dict[str, List[str]]:
+        """Repo names by license key, built once per repos payload"""
+        payload = self.repos_payload
+        built = getattr(self, "_license_index", None)
+        if built is not None and built[0] is payload:
+            return built[1]
+        index: Dict[str, List[str]] = {}
+        for repo in payload:
+            try:
+                key = access_nested_map(repo, ("license", "key"))
+            except KeyError:
+                continue
+            index.setdefault(key, []).append(repo["name"])
+        self._license_index = (payload, index)
+        return index
+
+    @property
+    def table(self) -> RepoTable:
+        """Columnar view of repos_payload for `query` and `count_by`,
+        built once per repos payload.
+        """
+        payload = self.repos_payload
+        built = getattr(self, "_table", None)
+        if built is not None and built[0] is payload:
+            return built[1]
+        table = RepoTable(payload)
+        self._table = (payload, table)
+        return table
+
+    def query(self, where: Iterable[Predicate] = (),
+              fields: Sequence[Field] = ("name",),
+              order_by: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Repos matching where, see `RepoTable.select`.
+        Example
+        -------
+        >>> client.query(where=[("language", "==", "Go")],
+        ...              fields=["name", "pushed_at"],
+        ...              order_by="-pushed_at", limit=5)
+        """
+        return self.table.select(where, fields, order_by, limit)
+
+    def count_by(self, field: Field,
+                 where: Iterable[Predicate] = ()) -> Dict[Any, int]:
+        """Repo counts per value of field, see `RepoTable.count_by`"""
+        return self.table.count_by(field, where)
 
     def public_repos(self, license: str = None) -> List[str]:
         """Public repos"""
-        json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
-
-        return public_repos
+        if license is not None:
+            return list(self.license_index.get(license, ()))
+        return [repo["name"] for repo in self.repos_payload]
 
     @staticmethod
     def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
@@ -55,4 +789,105 @@ class GithubOrgClient:
             has_license = access_nested_map(repo, ("license", "key")) == license_key
         except KeyError:
             return False
-        return has_license
\ No newline at end of file
+        return has_license
+
+
+def public_repos_many(
+        org_names: Iterable[str], license: str = None,
+        max_workers: int = 32, per_host: Optional[int] = None,
+        prefetch: int = 0, session: Optional[requests.Session] = None,
+        return_exceptions: bool = False,
+) -> Iterator[Tuple[str, Union[List[str], Exception]]]:
+    """Fan public_repos out over many orgs, yielding `(org, repos)`
+    pairs in completion order.
+    At most `max_workers` orgs are fetched at once, and at most
+    `per_host` (default 8) requests are open against any one host.
+    That cap is the connection pool of the session built here; a
+    `session` passed in keeps its own pool, so build it with
+    `make_session(pool_maxsize=n, pool_block=True)` for the same
+    effect. Giving both `session` and `per_host` raises ValueError.
+    With `return_exceptions`, a failing org yields `(org, exception)`
+    instead of aborting the whole batch.
+    Example
+    -------
+    >>> for org, repos in public_repos_many(["google", "abc"]):
+    ...     print(org, len(repos))
+    """
+    if session is not None and per_host is not None:
+        raise ValueError(
+            "per_host cannot be enforced on a caller's session; build "
+            "it with make_session(pool_maxsize=per_host, pool_block=True)")
+    return _public_repos_many(org_names, license, max_workers,
+                              8 if per_host is None else per_host,
+                              prefetch, session, return_exceptions)
+
+
+def _public_repos_many(
+        org_names: Iterable[str], license: Optional[str],
+        max_workers: int, per_host: int, prefetch: int,
+        session: Optional[requests.Session], return_exceptions: bool,
+) -> Iterator[Tuple[str, Union[List[str], Exception]]]:
+    """Generator behind public_repos_many"""
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_maxsize=per_host, pool_block=True)
+
+    def fetch(org_name: str) -> List[str]:
+        client = GithubOrgClient(org_name, prefetch=prefetch,
+                                 session=session)
+        return client.public_repos(license)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(copy_context().run, fetch, name): name
+                       for name in org_names}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        yield futures[future], future.result()
+                    except Exception as exc:
+                        if not return_exceptions:
+                            raise
+                        yield futures[future], exc
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        if own_session:
+            session.close()
+
+
+class AsyncGithubOrgClient:
+    """An asyncio Github org client
+    Memoized values are awaitable properties, e.g. `await client.org`.
+    """
+    ORG_URL = GithubOrgClient.ORG_URL
+    has_license = staticmethod(GithubOrgClient.has_license)
+
+    def __init__(self, org_name: str, prefetch: int = 0) -> None:
+        """Init method of AsyncGithubOrgClient"""
+        self._org_name = org_name
+        self._prefetch = prefetch
+
+    @async_memoize
+    async def org(self) -> Dict:
+        """Memoize org"""
+        return await async_get_json(self.ORG_URL.format(org=self._org_name))
+
+    async def _public_repos_url(self) -> str:
+        """Public repos URL"""
+        return (await self.org)["repos_url"]
+
+    @async_memoize
+    async def repos_payload(self) -> List[Dict]:
+        """Memoize repos payload, across all pages"""
+        pages = await async_get_json_pages(await self._public_repos_url(),
+                                           prefetch=self._prefetch)
+        return [repo for page in pages for repo in page]
+
+    async def public_repos(self, license: str = None) -> List[str]:
+        """Public repos"""
+        return [
+            repo["name"] for repo in await self.repos_payload
+            if license is None or self.has_license(repo, license)
+        ]
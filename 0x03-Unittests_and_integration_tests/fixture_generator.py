@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic org and repo payloads for benchmarks.
+Repos follow the schema of `fixtures.TEST_PAYLOAD` and can be produced
+at any size, lazily if needed, with a configurable license mix.
+Usage: ./fixture_generator.py [repos] > repos.json
+"""
+import base64
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from fixtures import TEST_PAYLOAD
+
+_TEMPLATE = TEST_PAYLOAD[0][1][0]
+_TEMPLATE_NAME = "{}/{}".format(_TEMPLATE["owner"]["login"],
+                                _TEMPLATE["name"])
+_EPOCH = datetime(2010, 1, 1, tzinfo=timezone.utc)
+LICENSES: Dict[str, Dict] = {
+    repo["license"]["key"]: repo["license"]
+    for repo in TEST_PAYLOAD[0][1] if repo.get("license")
+}
+LANGUAGES = sorted({repo["language"] for repo in TEST_PAYLOAD[0][1]
+                    if repo.get("language")})
+
+
+def fixture_license_weights() -> Dict[Optional[str], float]:
+    """License mix of the fixture repos; None stands for no license"""
+    weights: Dict[Optional[str], float] = {}
+    for repo in TEST_PAYLOAD[0][1]:
+        key = (repo.get("license") or {}).get("key")
+        weights[key] = weights.get(key, 0) + 1
+    return weights
+
+
+def _stamp(seconds: int) -> str:
+    """ISO 8601 timestamp `seconds` after the epoch of the generator"""
+    return (_EPOCH + timedelta(seconds=seconds)).strftime(
+        "%Y-%m-%dT%H:%M:%SZ")
+
+
+def iter_repos(n: int, org: str = "google",
+               licenses: Optional[Mapping[Optional[str], float]] = None,
+               seed: int = 0) -> Iterator[Dict]:
+    """Lazily yield n repo payloads for org.
+    `licenses` maps license keys to relative weights (None for no
+    license) and defaults to the fixture's own mix. Keys without a
+    fixture license get a minimal license object. The same arguments
+    always yield the same repos.
+    """
+    rng = random.Random(seed)
+    weights = dict(licenses or fixture_license_weights())
+    keys = list(weights)
+    cum_weights = list(accumulate(weights.values()))
+    owner = {k: v.replace("/google", "/" + org) if isinstance(v, str)
+             else v for k, v in _TEMPLATE["owner"].items()}
+    owner["login"] = org
+    strings = [k for k, v in _TEMPLATE.items()
+               if isinstance(v, str) and _TEMPLATE_NAME in v]
+    for i in range(n):
+        name = "repo-{:07d}".format(i)
+        full_name = "{}/{}".format(org, name)
+        repo = dict(_TEMPLATE)
+        for key in strings:
+            repo[key] = _TEMPLATE[key].replace(_TEMPLATE_NAME, full_name)
+        created = i * 3600 + rng.randrange(3600)
+        updated = created + rng.randrange(300 * 86400)
+        key = rng.choices(keys, cum_weights=cum_weights)[0]
+        stars = int(rng.paretovariate(1.2)) - 1
+        issues = rng.randrange(50)
+        repo.update({
+            "id": 10000000 + i,
+            "node_id": base64.b64encode(
+                "010:Repository{}".format(10000000 + i).encode()).decode(),
+            "name": name,
+            "full_name": full_name,
+            "owner": dict(owner),
+            "permissions": dict(_TEMPLATE["permissions"]),
+            "description": "Synthetic repo {} of {}".format(i, org),
+            "created_at": _stamp(created),
+            "updated_at": _stamp(updated),
+            "pushed_at": _stamp(created + rng.randrange(
+                updated - created + 1)),
+            "size": rng.randrange(100000),
+            "stargazers_count": stars,
+            "watchers_count": stars,
+            "watchers": stars,
+            "forks_count": stars // 4,
+            "forks": stars // 4,
+            "open_issues_count": issues,
+            "open_issues": issues,
+            "fork": rng.random() < 0.1,
+            "language": rng.choice(LANGUAGES),
+            "license": None if key is None else dict(LICENSES.get(
+                key, {"key": key, "name": key, "spdx_id": key.upper(),
+                      "url": "https://api.github.com/licenses/" + key,
+                      "node_id": ""})),
+        })
+        yield repo
+
+
+def generate_payload(n: int, org: str = "google",
+                     licenses: Optional[Mapping[Optional[str], float]] = None,
+                     seed: int = 0, license_key: str = "apache-2.0",
+                     ) -> Tuple[Dict, List[Dict], List[str], List[str]]:
+    """Build a TEST_PAYLOAD-shaped entry with n repos:
+    `(org_payload, repos_payload, expected_repos, <license_key>_repos)`.
+    Example
+    -------
+    >>> org, repos, names, apache2 = generate_payload(10000)
+    """
+    repos = list(iter_repos(n, org, licenses, seed))
+    org_payload = {"repos_url": "https://api.github.com/orgs/{}/repos"
+                   .format(org)}
+    return (org_payload, repos, [repo["name"] for repo in repos],
+            [repo["name"] for repo in repos
+             if (repo["license"] or {}).get("key") == license_key])
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    out = sys.stdout
+    out.write("[")
+    for index, item in enumerate(iter_repos(count)):
+        out.write(("," if index else "") + json.dumps(item))
+    out.write("]\n")
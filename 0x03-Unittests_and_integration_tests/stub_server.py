@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""A local stand-in for the GitHub orgs API, seeded from fixtures.
+Serves `/orgs/<org>`, `/orgs/<org>/repos` and the repositories query of
+`POST /graphql` with configurable latency, Link pagination, ETags, gzip
+and rate-limit headers, so the client can be load-tested end to end
+without network access.
+Usage: ./stub_server.py [--port 8000] [--latency 0.05] [--per-page 30]
+                        [--rate-limit 60] [--rate-window 60] [--no-gzip]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from client import GRAPHQL_FIELDS
+from fixtures import TEST_PAYLOAD
+
+SORT_FIELDS = {
+    "created": "created_at",
+    "updated": "updated_at",
+    "pushed": "pushed_at",
+    "full_name": "full_name",
+}
+REST_FIELDS = {graph: rest for rest, graph in GRAPHQL_FIELDS.items()}
+_TOKENS = re.compile(r"[A-Za-z_]\w*|[{}]")
+
+
+def _node_fields(query: str) -> List[Tuple[str, ...]]:
+    """Leaf paths selected under `nodes` in a GraphQL query"""
+    tokens = _TOKENS.findall(query[query.index("nodes") + 5:])
+    paths: List[Tuple[str, ...]] = []
+    stack: List[str] = []
+    pending: Optional[str] = None
+    depth = 0
+    for token in tokens:
+        if token == "{":
+            if pending is not None:
+                stack.append(pending)
+                pending = None
+            depth += 1
+        elif token == "}":
+            if pending is not None:
+                paths.append(tuple(stack) + (pending,))
+                pending = None
+            depth -= 1
+            if depth == 0:
+                break
+            stack.pop()
+        else:
+            if pending is not None:
+                paths.append(tuple(stack) + (pending,))
+            pending = token
+    return paths
+
+
+def _to_node(repo: Dict, paths: List[Tuple[str, ...]]) -> Dict:
+    """GraphQL node of a REST repo payload, selecting paths"""
+    node: Dict[str, Any] = {}
+    for path in paths:
+        rest = REST_FIELDS[path]
+        value: Any = repo
+        for key in rest:
+            value = value.get(key) if isinstance(value, dict) else None
+        if len(path) > 1 and value is None and \
+                (len(rest) == 1 or repo.get(rest[0]) is None):
+            node[path[0]] = None
+            continue
+        target = node
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return node
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler of GithubStub"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        """Serve an org or one page of its repos"""
+        self.respond(self.server.stub.handle)
+
+    def do_POST(self) -> None:
+        """Serve a GraphQL query"""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond(lambda path, headers: self.server.stub.handle_graphql(
+            path, headers, body))
+
+    def respond(self, handle: Callable) -> None:
+        """Send what handle(path, headers) builds, after the latency"""
+        stub = self.server.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+        status, body, headers = handle(self.path, self.headers)
+        if body and stub.gzip and \
+                "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """Silence per-request logging"""
+
+
+class GithubStub:
+    """In-process HTTP stand-in for the GitHub orgs API.
+    Example
+    -------
+    >>> with GithubStub(per_page=3, latency=0.01) as stub:
+    ...     client = GithubOrgClient("google")
+    ...     client.ORG_URL = stub.org_url
+    ...     client.public_repos()
+    """
+
+    def __init__(self, orgs: Optional[Dict[str, List[Dict]]] = None,
+                 latency: float = 0.0, per_page: int = 30,
+                 gzip: bool = True, rate_limit: Optional[int] = None,
+                 rate_window: float = 60.0, throttle_status: int = 403,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        """Init method of GithubStub
+        `orgs` maps org names to repo lists and defaults to the fixture
+        org, served as "google". `rate_limit` requests are allowed per
+        `rate_window` seconds, counted separately for REST ("core") and
+        "graphql" like GitHub does; after that requests get
+        `throttle_status` until the window resets.
+        """
+        if orgs is None:
+            orgs = {"google": TEST_PAYLOAD[0][1]}
+        self.orgs = orgs
+        self.latency = latency
+        self.per_page = per_page
+        self.gzip = gzip
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttle_status = throttle_status
+        self.requests = 0
+        self.throttled = 0
+        self.not_modified = 0
+        self._window_start: Dict[str, float] = {}
+        self._used: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server"""
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def org_url(self) -> str:
+        """Template to use as GithubOrgClient.ORG_URL"""
+        return self.url + "/orgs/{org}"
+
+    def start(self) -> "GithubStub":
+        """Serve on a daemon thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread"""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "GithubStub":
+        """Start the server"""
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the server"""
+        self.stop()
+
+    def _rate_limit(self, resource: str = "core"
+                    ) -> Tuple[bool, Dict[str, str]]:
+        """Count a request against resource; return whether it is
+        allowed, and headers
+        """
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return True, {}
+            now = time.time()
+            start = self._window_start.get(resource, 0.0)
+            if now >= start + self.rate_window:
+                start = self._window_start[resource] = now
+                self._used[resource] = 0
+            allowed = self._used[resource] < self.rate_limit
+            if allowed:
+                self._used[resource] += 1
+            else:
+                self.throttled += 1
+            return allowed, {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(
+                    self.rate_limit - self._used[resource]),
+                "X-RateLimit-Reset": str(int(
+                    start + self.rate_window + 0.999)),
+                "X-RateLimit-Resource": resource,
+            }
+
+    def _page(self, path: str, repos: List[Dict],
+              query: Dict[str, List[str]]) -> Tuple[List[Dict], str]:
+        """Slice one page of repos and build its Link header.
+        Repos keep their seeded order unless `sort` is given.
+        """
+        sort = query.get("sort", [None])[0]
+        if sort in SORT_FIELDS:
+            field = SORT_FIELDS[sort]
+            reverse = query.get("direction", [
+                "asc" if sort == "full_name" else "desc"])[0] == "desc"
+            repos = sorted(repos, key=lambda r: r.get(field) or "",
+                           reverse=reverse)
+        per_page = int(query.get("per_page", [self.per_page])[0])
+        page = int(query.get("page", ["1"])[0])
+        last = max(1, -(-len(repos) // per_page))
+        links = []
+        for rel, number in (("next", page + 1), ("last", last),
+                            ("first", 1), ("prev", page - 1)):
+            if (rel in ("next", "last") and page < last) or \
+                    (rel in ("first", "prev") and page > 1):
+                query["page"] = [str(number)]
+                links.append('<{}{}?{}>; rel="{}"'.format(
+                    self.url, path, urlencode(query, doseq=True), rel))
+        start = (page - 1) * per_page
+        return repos[start:start + per_page], ", ".join(links)
+
+    def handle(self, raw_path: str,
+               request_headers: Any) -> Tuple[int, bytes, Dict[str, str]]:
+        """Build the status, body and headers for a GET"""
+        allowed, headers = self._rate_limit()
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if not allowed:
+            if self.throttle_status == 429:
+                headers["Retry-After"] = str(max(0, int(
+                    headers["X-RateLimit-Reset"]) - int(time.time())))
+            return self.throttle_status, json.dumps(
+                {"message": "API rate limit exceeded"}).encode(), headers
+        parts = urlsplit(raw_path)
+        segments = parts.path.strip("/").split("/")
+        if len(segments) < 2 or segments[0] != "orgs" \
+                or segments[1] not in self.orgs or len(segments) > 3 \
+                or (len(segments) == 3 and segments[2] != "repos"):
+            return 404, json.dumps({"message": "Not Found"}).encode(), \
+                headers
+        org = segments[1]
+        payload: Any
+        if len(segments) == 2:
+            payload = {"login": org,
+                       "repos_url": "{}/orgs/{}/repos".format(self.url, org)}
+        else:
+            payload, link = self._page(parts.path, self.orgs[org],
+                                       parse_qs(parts.query))
+            if link:
+                headers["Link"] = link
+        body = json.dumps(payload).encode()
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        headers["ETag"] = etag
+        if request_headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.not_modified += 1
+            return 304, b"", headers
+        return 200, body, headers
+
+    def handle_graphql(self, raw_path: str, request_headers: Any,
+                       body: bytes) -> Tuple[int, bytes, Dict[str, str]]:
+        """Answer the repositories query of GraphQLBackend.
+        Only `organization.repositories` is understood, with `first`
+        and `after` pagination and the fields of GRAPHQL_FIELDS.
+        """
+        allowed, headers = self._rate_limit("graphql")
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if not allowed:
+            return self.throttle_status, json.dumps(
+                {"message": "API rate limit exceeded"}).encode(), headers
+        if urlsplit(raw_path).path != "/graphql":
+            return 404, json.dumps({"message": "Not Found"}).encode(), \
+                headers
+        request = json.loads(body)
+        variables = request.get("variables") or {}
+        org = variables.get("org")
+        try:
+            paths = _node_fields(request["query"])
+            unknown = [".".join(p) for p in paths if p not in REST_FIELDS]
+        except (KeyError, ValueError):
+            unknown, paths = ["query"], []
+        if unknown:
+            reply: Dict[str, Any] = {"errors": [{
+                "message": "Field '{}' doesn't exist".format(unknown[0])}]}
+        elif org not in self.orgs:
+            reply = {"data": {"organization": None}, "errors": [{
+                "type": "NOT_FOUND",
+                "message": "Could not resolve to an Organization with the"
+                           " login of '{}'.".format(org)}]}
+        else:
+            repos = self.orgs[org]
+            start = int(variables.get("after") or 0)
+            end = start + int(variables.get("first") or self.per_page)
+            reply = {"data": {"organization": {"repositories": {
+                "pageInfo": {"hasNextPage": end < len(repos),
+                             "endCursor": str(min(end, len(repos)))},
+                "nodes": [_to_node(repo, paths)
+                          for repo in repos[start:end]],
+            }}}}
+        return 200, json.dumps(reply).encode(), headers
+
+
+def main() -> None:
+    """Serve the fixture org until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--per-page", type=int, default=30)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--no-gzip", action="store_true")
+    args = parser.parse_args()
+    stub = GithubStub(latency=args.latency, per_page=args.per_page,
+                      gzip=not args.no_gzip, rate_limit=args.rate_limit,
+                      rate_window=args.rate_window, port=args.port)
+    print("Serving {} (Ctrl-C to stop)".format(stub.org_url))
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
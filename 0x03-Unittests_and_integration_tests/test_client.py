@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
+import asyncio
+import os
+import pickle
+import requests
+import tempfile
+import time
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, PropertyMock
 from parameterized import parameterized, parameterized_class
-from client import GithubOrgClient
+from client import GithubOrgClient, AsyncGithubOrgClient, public_repos_many
+from client import Repo, RepoTable, SnapshotStore
+from client import GraphQLBackend, GraphQLError, HTTPTransport, graphql_query
+from stub_server import GithubStub
+from fixture_generator import generate_payload, iter_repos
+from utils import (LRUCache, MetricsCollector, RateLimiter, ResponseCache,
+                   make_session, prime, set_instrumentation,
+                   set_rate_limiter, set_response_cache, set_url_cache)
 from fixtures import org_payload, repos_payload,\
     expected_repos, apache2_repos
 
@@ -30,9 +43,9 @@ class TestGithubOrgClient(unittest.TestCase):
 
         # Check that get_json was called exactly once with the correct URL
         mock_get_json.assert_called_once_with(
-            f"https://api.github.com/orgs/{org_name}")
+            f"https://api.github.com/orgs/{org_name}", session=None)
 
-    @patch('client.GithubOrgClient.org', new_callable=property)
+    @patch('client.GithubOrgClient.org', new_callable=PropertyMock)
     def test_public_repos_url(self, mock_org):
         """Test _public_repos_url property"""
         # Define the mocked payload with a known 'repos_url'
@@ -48,23 +61,24 @@ class TestGithubOrgClient(unittest.TestCase):
         # it matches the repos_url in the mock payload
         self.assertEqual(client._public_repos_url, mock_payload["repos_url"])
 
-    @patch('client.get_json')
-    def test_public_repos(self, mock_get_json):
+    @patch('client.get_json_pages')
+    def test_public_repos(self, mock_get_json_pages):
         """Test public_repos method"""
-        # Define the mocked payload returned by get_json
+        # Define the mocked pages returned by get_json_pages
         mock_repos_payload = [
             {"name": "repo1", "license": {"key": "mit"}},
             {"name": "repo2", "license": {"key": "apache-2.0"}},
             {"name": "repo3", "license": {"key": "gpl"}},
         ]
-        mock_get_json.return_value = mock_repos_payload
+        mock_get_json_pages.return_value = iter(
+            [mock_repos_payload[:2], mock_repos_payload[2:]])
 
         # Define the mocked URL for _public_repos_url
         mock_repos_url = "https://api.github.com/orgs/test_org/repos"
 
         with patch.object(
                 GithubOrgClient, '_public_repos_url',
-                new_callable=property) as mock_public_repos_url:
+                new_callable=PropertyMock) as mock_public_repos_url:
             mock_public_repos_url.return_value = mock_repos_url
 
             # Create a GithubOrgClient instance
@@ -76,9 +90,87 @@ class TestGithubOrgClient(unittest.TestCase):
             self.assertEqual(client.public_repos(), expected_repos)
 
             # Verify that _public_repos_url
-            # and get_json were each called exactly once
+            # and get_json_pages were each called exactly once
             mock_public_repos_url.assert_called_once()
-            mock_get_json.assert_called_once_with(mock_repos_url)
+            mock_get_json_pages.assert_called_once_with(
+                mock_repos_url, session=None, prefetch=0, fresh=False)
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_refresh_repos_keeps_org(self, mock_get_json,
+                                     mock_get_json_pages):
+        """Test refresh_repos refetches repos but not org"""
+        mock_get_json.return_value = {"repos_url": "https://example.com"}
+        mock_get_json_pages.side_effect = lambda *a, **kw: iter(
+            [[{"name": f"repo{mock_get_json_pages.call_count}"}]])
+        client = GithubOrgClient("test_org")
+
+        self.assertEqual(client.public_repos(), ["repo1"])
+        self.assertEqual(client.public_repos(), ["repo1"])
+        client.refresh_repos()
+        self.assertEqual(client.public_repos(), ["repo2"])
+        mock_get_json.assert_called_once()
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_license_index(self, mock_get_json, mock_get_json_pages):
+        """Test the license index is built once and follows the payload"""
+        mock_get_json.return_value = {"repos_url": "https://example.com"}
+        mock_get_json_pages.side_effect = [
+            iter([repos_payload]),
+            iter([[{"name": "new", "license": {"key": "mit"}}]]),
+        ]
+        client = GithubOrgClient("test_org")
+
+        with patch.object(GithubOrgClient, 'has_license') as mock_has_license:
+            self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+            index = client.license_index
+            self.assertEqual(client.public_repos("no-such-license"), [])
+            self.assertIs(client.license_index, index)
+            mock_has_license.assert_not_called()
+
+        for key, names in index.items():
+            self.assertEqual(names, [
+                repo["name"] for repo in repos_payload
+                if GithubOrgClient.has_license(repo, key)])
+        client.refresh_repos()
+        self.assertEqual(client.public_repos("mit"), ["new"])
+        self.assertEqual(client.public_repos("apache-2.0"), [])
+
+    @patch('client.get_json_stream')
+    @patch('client.get_json')
+    def test_public_repos_stream(self, mock_get_json, mock_get_json_stream):
+        """Test public_repos consumes the streaming parser directly"""
+        fields = [("name",), ("license", "key")]
+        mock_get_json.return_value = org_payload
+        mock_get_json_stream.return_value = iter(repos_payload)
+        client = GithubOrgClient("google", stream=True, fields=fields)
+
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+        mock_get_json_stream.assert_called_once_with(
+            org_payload["repos_url"], session=None,
+            fields=fields + [("updated_at",)])
+        self.assertEqual(client.repos_payload[0], {
+            "name": repos_payload[0]["name"],
+            "license": {"key": repos_payload[0]["license"]["key"]}})
+
+    @patch('client.get_json_pages')
+    def test_iter_public_repos_is_lazy(self, mock_get_json_pages):
+        """Test iter_public_repos yields before later pages are fetched"""
+        def pages():
+            yield [{"name": "repo1", "license": {"key": "mit"}}]
+            raise AssertionError("second page fetched too early")
+
+        mock_get_json_pages.return_value = pages()
+        with patch.object(
+                GithubOrgClient, '_public_repos_url',
+                new_callable=PropertyMock) as mock_public_repos_url:
+            mock_public_repos_url.return_value = "https://example.com/repos"
+            client = GithubOrgClient("test_org", prefetch=2)
+            self.assertEqual(next(client.iter_public_repos("mit")), "repo1")
+        mock_get_json_pages.assert_called_once_with(
+            "https://example.com/repos", session=None, prefetch=2,
+            fresh=False)
 
     @parameterized.expand([
         ({"license": {"key": "my_license"}}, "my_license", True),
@@ -104,7 +196,7 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up class-level mocks and fixtures"""
-        cls.get_patcher = patch('requests.get')
+        cls.get_patcher = patch('requests.Session.get')
 
         # Start the patcher and configure the side_effect
         cls.mock_get = cls.get_patcher.start()
@@ -146,10 +238,611 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
             client.public_repos(license="apache-2.0"), apache2_repos)
 
 
+class TestRepo(unittest.TestCase):
+    """Unit tests for the compact Repo record"""
+
+    @parameterized.expand([
+        ({"name": "a", "license": {"key": "mit", "name": "MIT"}}, "mit",
+         True),
+        ({"name": "a", "license": {"key": "gpl"}}, "mit", False),
+        ({"name": "a", "license": None}, "mit", False),
+        ({"name": "a"}, "mit", False),
+    ])
+    def test_has_license(self, repo, license_key, expected_result):
+        """Test has_license gives the same answer for records"""
+        record = Repo.from_dict(repo)
+        self.assertEqual(GithubOrgClient.has_license(record, license_key),
+                         expected_result)
+        self.assertEqual(GithubOrgClient.has_license(repo, license_key),
+                         expected_result)
+
+    def test_with_fields(self):
+        """Test extra fields are slotted and readable like the payload"""
+        repo_type = Repo.with_fields(("forks", "language"))
+        self.assertIs(repo_type, Repo.with_fields(("forks", "language")))
+        record = repo_type.from_dict(repos_payload[0])
+        self.assertEqual(dict(record), {
+            "name": "episodes.dart",
+            "license": {"key": "bsd-3-clause"},
+            "forks": repos_payload[0]["forks"],
+            "language": repos_payload[0]["language"],
+        })
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_compact_client(self, mock_get_json, mock_get_json_pages):
+        """Test a compact client stores records and filters on them"""
+        mock_get_json.return_value = org_payload
+        mock_get_json_pages.return_value = iter([repos_payload])
+        client = GithubOrgClient("google", compact=True)
+
+        self.assertEqual(client.public_repos(), expected_repos)
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+        self.assertTrue(all(isinstance(r, Repo)
+                            for r in client.repos_payload))
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Unit tests for warm-starting clients from snapshots"""
+
+    def setUp(self):
+        """Open a store in a fresh directory"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = SnapshotStore(os.path.join(tmp.name, "snap.db"))
+        self.addCleanup(self.store.close)
+
+    def test_save_load(self):
+        """Test payloads and Repo records round-trip with timestamps"""
+        self.assertIsNone(self.store.load("google", "org"))
+        record = Repo.from_dict(repos_payload[0])
+        self.store.save("google", "repos", [record], fetched_at=12.5)
+        self.assertEqual(self.store.load("google", "repos"),
+                         ([dict(record)], 12.5))
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_warm_start(self, mock_get_json, mock_get_json_pages):
+        """Test a new client serves snapshots, then refreshes them"""
+        mock_get_json.return_value = org_payload
+        mock_get_json_pages.return_value = iter([repos_payload])
+        GithubOrgClient("google", store=self.store).public_repos()
+
+        mock_get_json.reset_mock()
+        mock_get_json_pages.reset_mock()
+        mock_get_json_pages.return_value = iter([repos_payload[:1]])
+        client = GithubOrgClient("google", store=self.store, compact=True)
+        self.assertTrue(client.warm_start(refresh=False))
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+        mock_get_json.assert_not_called()
+
+        client.refresh_in_background().join()
+        self.assertEqual(client.public_repos(), ["episodes.dart"])
+        self.assertEqual(len(self.store.load("google", "repos")[0]), 1)
+
+    @patch('client.get_json')
+    def test_warm_start_backend(self, mock_get_json):
+        """Test a backend client warm-starts without an org snapshot"""
+        self.store.save("google", "repos", [
+            {"name": "a", "license": {"key": "mit"}}])
+        transport = MagicMock(return_value={"organization": {
+            "repositories": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [{"name": "b", "licenseInfo": None}]}}})
+        client = GithubOrgClient("google", store=self.store,
+                                 backend=GraphQLBackend(transport))
+        self.assertTrue(client.warm_start(refresh=False))
+        self.assertEqual(client.public_repos("mit"), ["a"])
+
+        client.refresh()
+        self.assertEqual(client.public_repos(), ["b"])
+        self.assertEqual(transport.call_count, 1)
+        mock_get_json.assert_not_called()
+        self.assertIsNone(self.store.load("google", "org"))
+
+    def test_warm_start_misses(self):
+        """Test missing or stale snapshots are not used"""
+        client = GithubOrgClient("google", store=self.store)
+        self.assertFalse(client.warm_start())
+        self.store.save("google", "org", org_payload, fetched_at=0)
+        self.store.save("google", "repos", repos_payload)
+        self.assertFalse(client.warm_start(max_age=60))
+        self.assertFalse(GithubOrgClient("google").warm_start())
+
+
+class TestSyncRepos(unittest.TestCase):
+    """Unit tests for incremental repo sync"""
+
+    def setUp(self):
+        """Serve a mutable repo list in pages of two, newest first"""
+        self.repos = [
+            {"name": f"repo{n}", "updated_at": f"2020-01-0{n}T00:00:00Z"}
+            for n in range(1, 8)
+        ]
+        self.pages_fetched = 0
+        self.failing_page = None
+        patcher = patch('client.get_json_pages',
+                        side_effect=self.get_json_pages)
+        self.mock_get_json_pages = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('client.get_json',
+                        return_value={"repos_url": "https://x/repos"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_json_pages(self, url, session=None, prefetch=0, fresh=False):
+        """Page through the repos, sorted when the sync asks for it"""
+        repos = self.repos
+        if "sort=updated&direction=desc" in url:
+            repos = sorted(repos, key=lambda r: r["updated_at"],
+                           reverse=True)
+        for start in range(0, len(repos), 2):
+            self.pages_fetched += 1
+            if self.pages_fetched == self.failing_page:
+                raise requests.ConnectionError("connection reset")
+            yield repos[start:start + 2]
+
+    def test_unchanged_org_costs_one_page(self):
+        """Test a sync with nothing new stops after the first page"""
+        client = GithubOrgClient("test_org")
+        client.public_repos()
+        self.pages_fetched = 0
+        self.assertEqual(client.sync_repos(), [])
+        self.assertEqual(self.pages_fetched, 1)
+
+    def test_merges_changes(self):
+        """Test updated and new repos are merged into the payload"""
+        client = GithubOrgClient("test_org", compact=True,
+                                 extra_fields=("updated_at",))
+        client.public_repos()
+        self.repos[1] = {"name": "repo2", "updated_at": "2020-02-01T00:00Z",
+                         "license": {"key": "mit"}}
+        self.repos.append({"name": "repo8",
+                           "updated_at": "2020-01-09T00:00:00Z"})
+        self.pages_fetched = 0
+
+        changed = client.sync_repos()
+
+        self.assertEqual([r["name"] for r in changed], ["repo2", "repo8"])
+        self.assertEqual(self.pages_fetched, 2)
+        self.assertEqual(client.public_repos(),
+                         [f"repo{n}" for n in range(1, 9)])
+        self.assertEqual(client.public_repos("mit"), ["repo2"])
+
+    def test_new_repo_at_watermark(self):
+        """Test a repo stamped at the watermark is taken if not held"""
+        client = GithubOrgClient("test_org", compact=True)
+        client.public_repos()
+        self.repos.append({"name": "repo7b",
+                           "updated_at": "2020-01-07T00:00:00Z"})
+        self.assertEqual([r["name"] for r in client.sync_repos()],
+                         ["repo7b"])
+
+    def test_failed_sync_keeps_watermark(self):
+        """Test a sync failing partway is redone in full by the retry"""
+        client = GithubOrgClient("test_org")
+        client.public_repos()
+        self.repos[0] = {"name": "repo1", "updated_at": "2020-02-02T00:00Z",
+                         "license": {"key": "mit"}}
+        self.repos[2] = {"name": "repo3", "updated_at": "2020-02-01T00:00Z",
+                         "license": {"key": "mit"}}
+        self.repos[4] = {"name": "repo5", "updated_at": "2020-01-31T00:00Z"}
+        self.pages_fetched, self.failing_page = 0, 2
+
+        with self.assertRaises(requests.ConnectionError):
+            client.sync_repos()
+        self.assertEqual(client._watermark, "2020-01-07T00:00:00Z")
+
+        self.pages_fetched, self.failing_page = 0, None
+        self.assertEqual([r["name"] for r in client.sync_repos()],
+                         ["repo1", "repo3", "repo5"])
+        self.assertEqual(client.public_repos("mit"), ["repo1", "repo3"])
+        self.assertEqual(client._watermark, "2020-02-02T00:00Z")
+
+    def test_first_sync_is_full(self):
+        """Test a sync without a cached payload fetches everything"""
+        client = GithubOrgClient("test_org")
+        self.assertEqual(len(client.sync_repos()), 7)
+        self.assertEqual(client._watermark, "2020-01-07T00:00:00Z")
+
+
+class TestGraphQLBackend(unittest.TestCase):
+    """Unit tests for the GraphQL projection backend"""
+
+    @staticmethod
+    def page(nodes, end=None):
+        """One page of a repositories reply"""
+        return {"organization": {"repositories": {
+            "pageInfo": {"hasNextPage": end is not None, "endCursor": end},
+            "nodes": nodes,
+        }}}
+
+    def test_query_selects_only_fields(self):
+        """Test only the GraphQL counterparts of fields are selected"""
+        query = graphql_query((("name",), ("license", "key")))
+        self.assertIn("nodes { name licenseInfo { key } }", query)
+        self.assertNotIn("stargazerCount", query)
+        with self.assertRaises(ValueError):
+            graphql_query((("owner", "login"),))
+
+    def test_pages_and_shape(self):
+        """Test cursors are followed and nodes come back REST-shaped"""
+        transport = MagicMock(side_effect=[
+            self.page([{"name": "a", "licenseInfo": {"key": "mit"},
+                        "primaryLanguage": {"name": "Go"}}], end="1"),
+            self.page([{"name": "b", "licenseInfo": None,
+                        "primaryLanguage": None}]),
+        ])
+        fields = [("name",), ("license", "key"), ("language",)]
+        repos = list(GraphQLBackend(transport).iter_repos("acme", fields))
+        self.assertEqual(repos, [
+            {"name": "a", "license": {"key": "mit"}, "language": "Go"},
+            {"name": "b", "license": None, "language": None},
+        ])
+        self.assertEqual([c.args[1]["after"] for c in
+                          transport.call_args_list], [None, "1"])
+
+    def test_client_skips_org(self):
+        """Test repos come from the backend without fetching org"""
+        transport = MagicMock(return_value=self.page(
+            [{"name": "a", "licenseInfo": {"key": "mit"}},
+             {"name": "b", "licenseInfo": None}]))
+        with patch('client.get_json') as mock_get_json:
+            client = GithubOrgClient("acme", backend=GraphQLBackend(
+                transport))
+            self.assertEqual(client.public_repos(), ["a", "b"])
+            self.assertEqual(client.public_repos("mit"), ["a"])
+        mock_get_json.assert_not_called()
+        transport.assert_called_once()
+
+    def test_errors(self):
+        """Test GraphQL errors surface as GraphQLError"""
+        with patch('client.post_json') as mock_post_json:
+            mock_post_json.return_value = {"errors": [{"message": "boom"}]}
+            with self.assertRaisesRegex(GraphQLError, "boom"):
+                list(GraphQLBackend(HTTPTransport()).iter_repos("acme"))
+        with self.assertRaises(GraphQLError):
+            list(GraphQLBackend(MagicMock(return_value={
+                "organization": None})).iter_repos("acme"))
+
+
+class TestRepoQuery(unittest.TestCase):
+    """Unit tests for the columnar repo query engine"""
+
+    def setUp(self):
+        """A client whose repos payload is the fixture"""
+        self.client = GithubOrgClient("google")
+        prime(self.client, "repos_payload", repos_payload)
+
+    def test_where_and_fields(self):
+        """Test predicates combine and fields are keyed as given"""
+        self.assertEqual(self.client.query(
+            where=[("stargazers_count", ">", 100), ("fork", "==", False)],
+            fields=["name", ("license", "key")]), [
+            {"name": "ios-webkit-debug-proxy", "license.key": "other"},
+            {"name": "kratu", "license.key": "apache-2.0"},
+            {"name": "traceur-compiler", "license.key": "apache-2.0"},
+        ])
+        self.assertEqual(
+            self.client.query(where=[("language", "in", ["C", "C++"])]),
+            [{"name": "cpp-netlib"}, {"name": "ios-webkit-debug-proxy"}])
+        with self.assertRaises(ValueError):
+            self.client.query(where=[("name", "~", "x")])
+
+    def test_missing_values(self):
+        """Test None neither matches comparisons nor sorts first"""
+        self.assertEqual(self.client.query(
+            where=[("license.key", ">=", "o")]),
+            [{"name": "ios-webkit-debug-proxy"},
+             {"name": "build-debian-cloud"}])
+        self.assertEqual(self.client.query(
+            order_by="license.key")[-1], {"name": "google.github.io"})
+        self.assertEqual(self.client.query(
+            order_by="-license.key")[-1], {"name": "google.github.io"})
+
+    @parameterized.expand([("sort", None), ("top_k", 3)])
+    def test_order_by(self, _name, limit):
+        """Test descending order, with and without a top-k limit"""
+        names = [row["name"] for row in self.client.query(
+            order_by="-stargazers_count", limit=limit)]
+        self.assertEqual(names[:3], ["dagger", "traceur-compiler",
+                                     "ios-webkit-debug-proxy"])
+        self.assertEqual(len(names), limit or len(repos_payload))
+
+    def test_count_by(self):
+        """Test group-by counts, most common first"""
+        self.assertEqual(self.client.count_by("license.key"), {
+            "apache-2.0": 4, "other": 2, "bsd-3-clause": 1, "bsl-1.0": 1,
+            None: 1})
+        self.assertEqual(self.client.count_by(
+            "fork", where=[("license.key", "==", "apache-2.0")]),
+            {False: 3, True: 1})
+
+    def test_table_follows_payload(self):
+        """Test the table is rebuilt when repos_payload changes"""
+        table = self.client.table
+        self.assertIs(self.client.table, table)
+        prime(self.client, "repos_payload", repos_payload[:2])
+        self.assertEqual(len(self.client.table), 2)
+
+    def test_concat(self):
+        """Test tables of several orgs query as one"""
+        other = GithubOrgClient("acme")
+        prime(other, "repos_payload", generate_payload(5, org="acme")[1])
+        self.client.table.column("owner.login")
+        table = RepoTable.concat([self.client.table, other.table])
+        self.assertEqual(len(table), len(repos_payload) + 5)
+        self.assertEqual(table.count_by("owner.login"),
+                         {"google": len(repos_payload), "acme": 5})
+
+
+class TestPublicReposMany(unittest.TestCase):
+    """Unit tests for the multi-org fan-out"""
+
+    @staticmethod
+    def slow_get_json(url, session):
+        """Org lookup that takes 50ms"""
+        time.sleep(0.05)
+        return {"repos_url": url + "/repos"}
+
+    @staticmethod
+    def slow_get_json_pages(url, session, prefetch, fresh):
+        """Repos lookup that takes 50ms, failing for the 'bad' org"""
+        time.sleep(0.05)
+        if "/bad/" in url:
+            raise KeyError("bad")
+        return iter([[{"name": url.split("/")[-2], "license": None}]])
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_runs_concurrently(self, mock_get_json, mock_get_json_pages):
+        """Test 20 orgs finish in about the time of one"""
+        mock_get_json.side_effect = self.slow_get_json
+        mock_get_json_pages.side_effect = self.slow_get_json_pages
+        orgs = [f"org{n}" for n in range(20)]
+
+        start = time.perf_counter()
+        results = dict(public_repos_many(orgs, max_workers=20))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, {org: [org] for org in orgs})
+        self.assertLess(elapsed, 20 * 0.1 / 4)
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_return_exceptions(self, mock_get_json, mock_get_json_pages):
+        """Test a failing org is reported without aborting the batch"""
+        mock_get_json.side_effect = self.slow_get_json
+        mock_get_json_pages.side_effect = self.slow_get_json_pages
+
+        results = dict(public_repos_many(["good", "bad"],
+                                         return_exceptions=True))
+        self.assertEqual(results["good"], ["good"])
+        self.assertIsInstance(results["bad"], KeyError)
+        with self.assertRaises(KeyError):
+            dict(public_repos_many(["bad"]))
+
+    def test_per_host_needs_own_session(self):
+        """Test per_host with a caller's session is refused up front"""
+        session = make_session()
+        self.addCleanup(session.close)
+        with self.assertRaises(ValueError):
+            public_repos_many(["google"], per_host=2, session=session)
+
+
+class TestAsyncGithubOrgClient(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncGithubOrgClient"""
+
+    @patch('client.async_get_json_pages')
+    @patch('client.async_get_json')
+    async def test_public_repos(self, mock_get_json, mock_get_json_pages):
+        """Test org, repos_payload and public_repos share memoized calls"""
+        mock_get_json.return_value = org_payload
+        mock_get_json_pages.return_value = [
+            repos_payload[:3], repos_payload[3:]]
+        client = AsyncGithubOrgClient("google")
+
+        results = await asyncio.gather(
+            client.public_repos(), client.public_repos("apache-2.0"))
+
+        self.assertEqual(results, [expected_repos, apache2_repos])
+        self.assertEqual(await client.org, org_payload)
+        mock_get_json.assert_called_once_with(
+            "https://api.github.com/orgs/google")
+        mock_get_json_pages.assert_called_once_with(
+            org_payload["repos_url"], prefetch=0)
+
+
+class TestEndToEnd(unittest.TestCase):
+    """GithubOrgClient against the local stand-in server"""
+
+    def start_stub(self, **kwargs):
+        """Serve the fixture org and point GithubOrgClient at it"""
+        stub = GithubStub(**kwargs).start()
+        self.addCleanup(stub.stop)
+        patcher = patch.object(GithubOrgClient, "ORG_URL", stub.org_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return stub
+
+    @parameterized.expand([("sequential", 0), ("prefetch", 2)])
+    def test_pagination(self, _name, prefetch):
+        """Test every page is followed over real HTTP"""
+        stub = self.start_stub(per_page=2)
+        client = GithubOrgClient("google", prefetch=prefetch)
+        self.assertEqual(client.public_repos(), expected_repos)
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+        self.assertEqual(stub.requests, 1 + 5)
+
+    def test_stream(self):
+        """Test the streaming parser over gzip-encoded pages"""
+        self.start_stub(per_page=4)
+        client = GithubOrgClient("google", stream=True,
+                                 fields=[("name",), ("license", "key")])
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+
+    def test_etag(self):
+        """Test unchanged pages come back as 304s"""
+        stub = self.start_stub(per_page=5)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        set_response_cache(ResponseCache(tmp.name))
+        self.addCleanup(set_response_cache, None)
+
+        GithubOrgClient("google").public_repos()
+        self.assertEqual(GithubOrgClient("google").public_repos(),
+                         expected_repos)
+        self.assertEqual(stub.not_modified, 3)
+
+    def test_rate_limit(self):
+        """Test the scheduler rides out a tight server rate limit"""
+        stub = self.start_stub(per_page=2, rate_limit=3, rate_window=0.5,
+                               throttle_status=429)
+        set_rate_limiter(RateLimiter(rate=1000, base_delay=0.05))
+        self.addCleanup(set_rate_limiter, None)
+        self.assertEqual(GithubOrgClient("google").public_repos(),
+                         expected_repos)
+
+    @parameterized.expand([
+        ("gzip", False, "gzip"),
+        ("gzip_stream", True, "gzip"),
+        ("identity", False, "identity"),
+        ("identity_stream", True, "identity"),
+    ])
+    def test_compression_accounting(self, _name, stream, encoding):
+        """Test wire and decoded bytes follow the Accept-Encoding policy"""
+        self.start_stub(per_page=3)
+        metrics = MetricsCollector()
+        set_instrumentation(metrics)
+        self.addCleanup(set_instrumentation, None)
+        session = make_session(accept_encoding=(encoding,))
+        self.addCleanup(session.close)
+        client = GithubOrgClient("google", session=session, stream=stream)
+        self.assertEqual(client.public_repos(), expected_repos)
+        (url, used), (wire, decoded) = [
+            item for item in metrics.transfer.items()
+            if item[0][0].endswith("/repos")][0]
+        self.assertEqual(used, encoding)
+        if encoding == "identity":
+            self.assertEqual(wire, decoded)
+        else:
+            self.assertLess(wire * 3, decoded)
+
+    def test_graphql(self):
+        """Test the projection backend against the stub's /graphql"""
+        stub = self.start_stub()
+        backend = GraphQLBackend(HTTPTransport(stub.url + "/graphql"),
+                                 page_size=3)
+        client = GithubOrgClient("google", backend=backend, compact=True)
+        self.assertEqual(client.public_repos(), expected_repos)
+        self.assertEqual(client.public_repos("apache-2.0"), apache2_repos)
+        self.assertEqual(stub.requests, 3)
+
+    def test_graphql_rate_limit_is_separate(self):
+        """Test GraphQL and REST requests spend their own budgets"""
+        stub = self.start_stub(per_page=5, rate_limit=4)
+        limiter = RateLimiter(rate=1000)
+        set_rate_limiter(limiter)
+        self.addCleanup(set_rate_limiter, None)
+        backend = GraphQLBackend(HTTPTransport(stub.url + "/graphql"),
+                                 page_size=3)
+        GithubOrgClient("google", backend=backend).public_repos()
+        graphql = stub.requests
+        GithubOrgClient("google").public_repos()
+        self.assertEqual(limiter.remaining, {
+            "graphql": 4 - graphql, "core": 4 - (stub.requests - graphql)})
+        self.assertEqual(stub.throttled, 0)
+
+    def test_refetch_with_url_cache(self):
+        """Test refresh_repos and sync_repos see past the URL cache"""
+        repos = [dict(repo) for repo in repos_payload]
+        self.start_stub(orgs={"google": repos}, per_page=4)
+        set_url_cache(LRUCache())
+        self.addCleanup(set_url_cache, None)
+        client = GithubOrgClient("google")
+        self.assertEqual(client.public_repos(), expected_repos)
+
+        repos.append(dict(repos[0], name="new-repo"))
+        self.assertEqual(GithubOrgClient("google").public_repos(),
+                         expected_repos)
+        client.refresh_repos()
+        self.assertEqual(client.public_repos(),
+                         expected_repos + ["new-repo"])
+
+        repos[1] = dict(repos[1], license={"key": "mit"},
+                        updated_at="2099-01-01T00:00:00Z")
+        client.sync_repos()
+        self.assertEqual(client.public_repos("mit"), [repos[1]["name"]])
+
+    def test_sync_repos(self):
+        """Test an unchanged org syncs in one page"""
+        stub = self.start_stub(per_page=2)
+        client = GithubOrgClient("google")
+        client.public_repos()
+        stub.requests = 0
+        self.assertEqual(client.sync_repos(), [])
+        self.assertEqual(stub.requests, 1)
+
+    def test_sync_repos_stream_projection(self):
+        """Test a streaming sync keeps the declared fields only"""
+        repos = [dict(repo) for repo in repos_payload]
+        self.start_stub(orgs={"google": repos}, per_page=2)
+        fields = [("name",), ("license", "key")]
+        client = GithubOrgClient("google", stream=True, fields=fields)
+        client.public_repos()
+        repos[0] = dict(repos[0], license={"key": "mit"},
+                        updated_at="2099-01-01T00:00:00Z")
+
+        self.assertEqual(client.sync_repos(), [
+            {"name": repos[0]["name"], "license": {"key": "mit"}}])
+        self.assertLessEqual(
+            {key for repo in client.repos_payload for key in repo},
+            {"name", "license"})
+        self.assertEqual(client.public_repos("mit"), [repos[0]["name"]])
+
+
+class TestFixtureGenerator(unittest.TestCase):
+    """Unit tests for the synthetic fixture generator"""
+
+    def test_schema_and_determinism(self):
+        """Test repos match the fixture schema and are reproducible"""
+        repos = list(iter_repos(20, org="acme", seed=3))
+        self.assertEqual(repos, list(iter_repos(20, org="acme", seed=3)))
+        self.assertNotEqual(repos, list(iter_repos(20, org="acme", seed=4)))
+        for repo in repos:
+            self.assertEqual(set(repo), set(repos_payload[0]))
+            self.assertTrue(repo["forks_url"].endswith(
+                repo["full_name"] + "/forks"))
+            self.assertEqual(repo["owner"]["login"], "acme")
+
+    def test_license_mix(self):
+        """Test the requested license weights are honoured"""
+        repos = list(iter_repos(2000, licenses={"mit": 1, None: 1}))
+        keys = [(repo["license"] or {}).get("key") for repo in repos]
+        self.assertEqual(set(keys), {"mit", None})
+        self.assertAlmostEqual(keys.count("mit") / len(keys), 0.5, delta=0.05)
+
+    @patch('client.get_json_pages')
+    @patch('client.get_json')
+    def test_client_on_generated_org(self, mock_get_json,
+                                     mock_get_json_pages):
+        """Test the generated tuple works like a TEST_PAYLOAD entry"""
+        org, repos, expected, apache2 = generate_payload(500)
+        mock_get_json.return_value = org
+        mock_get_json_pages.return_value = iter([repos])
+        client = GithubOrgClient("google")
+        self.assertEqual(client.public_repos(), expected)
+        self.assertEqual(client.public_repos("apache-2.0"), apache2)
+        self.assertTrue(apache2)
+
+
 class MockResponse:
     """Mock response object to simulate .json() for requests.get"""
     def __init__(self, json_data):
         self.json_data = json_data
+        self.links = {}
 
     def json(self):
         return self.json_data
@@ -1,10 +1,31 @@
 #!/usr/bin/env python3
 """ Unit tests for utils.access_nested_map """
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+import time
 import unittest
+import zlib
+from array import array
+from types import MappingProxyType
 from parameterized import parameterized
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, MagicMock
 from utils import access_nested_map, get_json
-from utils import memoize
+from utils import memoize, make_session, get_json_pages
+from utils import CacheEntry, ResponseCache, set_response_cache
+from utils import async_get_json, async_memoize
+from utils import invalidate, is_cached
+from utils import LRUCache, set_url_cache
+from utils import compile_path, extract_columns
+from utils import iter_json_array, get_json_stream, project
+from utils import RateLimiter, set_rate_limiter, request_priority
+from utils import rate_limit_resource
+from utils import BACKGROUND, INTERACTIVE
+from utils import MetricsCollector, set_instrumentation
+from utils import ENCODINGS, STREAM_CHUNK_SIZE
+from fixtures import repos_payload
 
 
 class TestAccessNestedMap(unittest.TestCase):
@@ -31,6 +52,62 @@ class TestAccessNestedMap(unittest.TestCase):
         self.assertEqual(str(context.exception),
                          f"'{expected_exception_message}'")
 
+    @parameterized.expand([
+        ({"a": 1}, ("a",), 1),
+        ({"a": {"b": 2}}, ["a"], {"b": 2}),
+        ({"a": MappingProxyType({"b": 2})}, ("a", "b"), 2),
+        ({"a": 1}, (), {"a": 1}),
+    ])
+    def test_compile_path(self, nested_map, path, expected):
+        """Test a compiled accessor matches access_nested_map"""
+        self.assertEqual(compile_path(path)(nested_map), expected)
+        self.assertEqual(compile_path(path)(nested_map),
+                         access_nested_map(nested_map, path))
+
+    @parameterized.expand([
+        ({}, ("a",)),
+        ({"a": 1}, ("a", "b")),
+        ({"a": [1, 2]}, ("a", 0)),
+        ({"a": "text"}, ("a", 0)),
+    ])
+    def test_compile_path_exception(self, nested_map, path):
+        """Test a compiled accessor raises the same KeyError"""
+        with self.assertRaises(KeyError) as expected:
+            access_nested_map(nested_map, path)
+        with self.assertRaises(KeyError) as context:
+            compile_path(path)(nested_map)
+        self.assertEqual(context.exception.args, expected.exception.args)
+
+    def test_compile_path_is_cached(self):
+        """Test equal paths share one accessor"""
+        self.assertIs(compile_path(["x", "y"]), compile_path(("x", "y")))
+
+
+class TestExtractColumns(unittest.TestCase):
+    """Unit tests for bulk column extraction"""
+
+    PATHS = [("name",), ("license", "key"), ("owner", "login"),
+             ("stargazers_count",)]
+
+    def test_matches_access_nested_map(self):
+        """Test every cell equals access_nested_map or the default"""
+        columns = extract_columns(repos_payload, self.PATHS, default="-")
+        for path in self.PATHS:
+            expected = []
+            for repo in repos_payload:
+                try:
+                    expected.append(access_nested_map(repo, path))
+                except KeyError:
+                    expected.append("-")
+            self.assertEqual(columns[path], expected)
+
+    def test_typecodes(self):
+        """Test numeric columns can be packed into arrays"""
+        columns = extract_columns(
+            [{"n": 1}, {"n": 2}, {}], [["n"]],
+            default=-1, typecodes={("n",): "q"})
+        self.assertEqual(columns, {("n",): array("q", [1, 2, -1])})
+
 
 class TestGetJson(unittest.TestCase):
     """Unit tests for get_json function in utils module"""
@@ -39,21 +116,590 @@ class TestGetJson(unittest.TestCase):
         ("http://example.com", {"payload": True}),
         ("http://holberton.io", {"payload": False}),
     ])
-    @patch('utils.requests.get')
-    def test_get_json(self, test_url, test_payload, mock_get):
-        """Test get_json returns expected result with mocked requests.get"""
+    @patch('utils.get_session')
+    def test_get_json(self, test_url, test_payload, mock_get_session):
+        """Test get_json returns expected result with a mocked session"""
         # Configure the mock to return a response with a custom json method
         mock_response = Mock()
         mock_response.json.return_value = test_payload
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value = mock_response
 
         # Call get_json and verify the output
         result = get_json(test_url)
         self.assertEqual(result, test_payload)
 
-        # Verify requests.get was called exactly once with test_url
+        # Verify the session's get was called exactly once with test_url
         mock_get.assert_called_once_with(test_url)
 
+    @patch('utils.get_session')
+    def test_get_json_injected_session(self, mock_get_session):
+        """Test get_json uses an injected session over the shared one"""
+        session = Mock()
+        session.get.return_value.json.return_value = {"payload": True}
+
+        self.assertEqual(get_json("http://example.com", session=session),
+                         {"payload": True})
+        session.get.assert_called_once_with("http://example.com")
+        mock_get_session.assert_not_called()
+
+    @parameterized.expand([
+        (("gzip",), "gzip"),
+        (("deflate", "gzip"), "deflate, gzip"),
+        ((), "identity"),
+    ])
+    def test_make_session_accept_encoding(self, policy, header):
+        """Test the Accept-Encoding policy of a session"""
+        session = make_session(accept_encoding=policy)
+        self.assertEqual(session.headers["Accept-Encoding"], header)
+
+    def test_make_session_unsupported_encoding(self):
+        """Test encodings that cannot be decoded are refused"""
+        with self.assertRaises(ValueError):
+            make_session(accept_encoding=("gzip", "zstd"))
+        if "br" not in ENCODINGS:
+            with self.assertRaises(ValueError):
+                make_session(accept_encoding=("br",))
+
+    def test_make_session_pool_size(self):
+        """Test make_session mounts a pooled adapter for both schemes"""
+        session = make_session(pool_maxsize=32)
+        for prefix in ("http://", "https://"):
+            adapter = session.get_adapter(prefix + "example.com")
+            self.assertEqual(adapter._pool_maxsize, 32)
+
+
+class TestGetJsonPages(unittest.TestCase):
+    """Unit tests for Link-header pagination in get_json_pages"""
+
+    URL = "https://api.github.com/orgs/google/repos"
+
+    def make_session(self, last_page):
+        """Session whose pages link to each other up to last_page"""
+        def get(url):
+            page = int(url.rsplit("page=", 1)[1]) if "page=" in url else 1
+            response = Mock()
+            response.json.return_value = [page]
+            response.links = {}
+            if page < last_page:
+                response.links = {
+                    "next": {"url": f"{self.URL}?page={page + 1}"},
+                    "last": {"url": f"{self.URL}?page={last_page}"},
+                }
+            return response
+
+        session = Mock()
+        session.get.side_effect = get
+        return session
+
+    @parameterized.expand([
+        ("single_page", 1, 0),
+        ("sequential", 5, 0),
+        ("prefetch", 5, 2),
+        ("prefetch_wider_than_pages", 3, 8),
+    ])
+    def test_pages_in_order(self, _name, last_page, prefetch):
+        """Test every page is fetched once and yielded in order"""
+        session = self.make_session(last_page)
+        pages = list(get_json_pages(self.URL, session, prefetch=prefetch))
+        self.assertEqual(pages, [[n] for n in range(1, last_page + 1)])
+        self.assertEqual(session.get.call_count, last_page)
+
+    def test_lazy(self):
+        """Test later pages are not requested before they are needed"""
+        session = self.make_session(5)
+        pages = get_json_pages(self.URL, session)
+        self.assertEqual(next(pages), [1])
+        session.get.assert_called_once_with(self.URL)
+
+
+class TestResponseCache(unittest.TestCase):
+    """Unit tests for the ETag conditional request cache"""
+
+    URL = "https://api.github.com/orgs/google"
+
+    def setUp(self):
+        """Point get_json at a cache in a fresh directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name)
+        set_response_cache(self.cache)
+        self.addCleanup(set_response_cache, None)
+        self.addCleanup(self.tmp.cleanup)
+
+    @staticmethod
+    def response(status, payload=None, headers=None):
+        """Build a mocked response"""
+        response = Mock(status_code=status, headers=headers or {},
+                        content=b"x" * 10, links={})
+        response.json.return_value = payload
+        return response
+
+    def test_not_modified_returns_cached_body(self):
+        """Test a 304 returns the stored body without decoding"""
+        session = Mock()
+        first = self.response(200, {"login": "google"}, {"ETag": '"v1"'})
+        second = self.response(304)
+        session.get.side_effect = [first, second]
+
+        self.assertEqual(get_json(self.URL, session), {"login": "google"})
+        self.assertEqual(get_json(self.URL, session), {"login": "google"})
+
+        session.get.assert_called_with(
+            self.URL, headers={"If-None-Match": '"v1"'})
+        second.json.assert_not_called()
+        self.assertEqual(self.cache.stats(), {
+            "hits": 1, "misses": 1, "revalidated": 1, "bytes_saved": 10})
+
+    def test_changed_body_replaces_entry(self):
+        """Test a 200 on revalidation stores the new validators"""
+        session = Mock()
+        session.get.side_effect = [
+            self.response(200, {"v": 1}, {"Last-Modified": "Mon"}),
+            self.response(200, {"v": 2}, {"Last-Modified": "Tue"}),
+        ]
+        get_json(self.URL, session)
+        self.assertEqual(get_json(self.URL, session), {"v": 2})
+        self.assertEqual(self.cache.get(self.URL).last_modified, "Tue")
+        self.assertEqual(self.cache.stats(), {
+            "hits": 0, "misses": 2, "revalidated": 1, "bytes_saved": 0})
+
+    def test_persists_across_instances(self):
+        """Test entries are read back from disk by a new cache"""
+        session = Mock()
+        session.get.return_value = self.response(
+            200, [1, 2], {"ETag": '"v1"'})
+        get_json(self.URL, session)
+        entry = ResponseCache(self.tmp.name).get(self.URL)
+        self.assertEqual((entry.etag, entry.body), ('"v1"', [1, 2]))
+
+    def test_stored_as_json(self):
+        """Test entries are plain JSON, and unreadable ones are misses"""
+        session = Mock()
+        session.get.return_value = self.response(
+            200, {"login": "google"}, {"ETag": '"v1"'})
+        get_json(self.URL, session)
+        path = self.cache._path(self.URL)
+        with open(path) as f:
+            self.assertEqual(json.load(f)["body"], {"login": "google"})
+        with open(path, "wb") as f:
+            f.write(b"\x80\x04garbage")
+        self.assertIsNone(ResponseCache(self.tmp.name).get(self.URL))
+
+    def test_memory_is_bounded(self):
+        """Test only memory_entries entries stay in memory"""
+        cache = ResponseCache(self.tmp.name, memory_entries=2)
+        for i in range(5):
+            cache.put("{}/{}".format(self.URL, i),
+                      CacheEntry('"v"', None, i, {}, 1))
+        self.assertEqual(cache._entries.stats()["entries"], 2)
+        self.assertEqual(cache.get(self.URL + "/0").body, 0)
+
+
+class TestLRUCache(unittest.TestCase):
+    """Unit tests for the process-wide URL cache"""
+
+    def test_evicts_by_count(self):
+        """Test the least recently used entry goes first"""
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1, 1)
+        cache.put("b", 2, 1)
+        cache.get("a")
+        cache.put("c", 3, 1)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")),
+                         (1, None, 3))
+        self.assertEqual(cache.stats(), {"hits": 3, "misses": 1,
+                                         "evictions": 1, "entries": 2,
+                                         "bytes": 2})
+
+    def test_evicts_by_bytes(self):
+        """Test total bytes stay under max_bytes"""
+        cache = LRUCache(max_bytes=100)
+        cache.put("a", 1, 60)
+        cache.put("b", 2, 60)
+        cache.put("huge", 3, 101)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.stats()["bytes"], 60)
+
+    def test_oversized_value_replaces(self):
+        """Test an oversized value still drops the one it replaces"""
+        cache = LRUCache(max_bytes=100)
+        cache.put("u", "old", 10)
+        cache.put("u", "new", 500)
+        self.assertIsNone(cache.get("u"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    @patch('utils.time.monotonic')
+    def test_ttl(self, mock_monotonic):
+        """Test entries expire after ttl seconds"""
+        cache = LRUCache(ttl=5)
+        mock_monotonic.return_value = 0
+        cache.put("a", 1, 1)
+        mock_monotonic.return_value = 5
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    @patch('utils.get_session')
+    def test_shared_by_get_json(self, mock_get_session):
+        """Test a second get_json of the same URL skips the network"""
+        set_url_cache(LRUCache())
+        self.addCleanup(set_url_cache, None)
+        response = mock_get_session.return_value.get.return_value
+        response.json.return_value = {"payload": True}
+        response.content = b"{}"
+        response.status_code = 200
+
+        self.assertEqual(get_json("http://example.com"), {"payload": True})
+        self.assertEqual(get_json("http://example.com"), {"payload": True})
+        mock_get_session.return_value.get.assert_called_once()
+
+    @patch('utils.get_session')
+    def test_errors_are_not_cached(self, mock_get_session):
+        """Test non-2xx bodies are not served from the URL cache"""
+        set_url_cache(LRUCache())
+        self.addCleanup(set_url_cache, None)
+        denied = Mock(status_code=403, content=b"{}", links={})
+        denied.json.return_value = {"message": "API rate limit exceeded"}
+        ok = Mock(status_code=200, content=b"{}", links={})
+        ok.json.return_value = {"payload": True}
+        mock_get_session.return_value.get.side_effect = [denied, ok]
+
+        get_json("http://example.com")
+        self.assertEqual(get_json("http://example.com"), {"payload": True})
+        self.assertEqual(mock_get_session.return_value.get.call_count, 2)
+
+    @patch('utils.get_session')
+    def test_fresh_bypasses(self, mock_get_session):
+        """Test fresh=True refetches and refreshes the cached body"""
+        set_url_cache(LRUCache())
+        self.addCleanup(set_url_cache, None)
+        responses = []
+        for version in (1, 2):
+            response = Mock(status_code=200, content=b"{}", links={})
+            response.json.return_value = {"v": version}
+            responses.append(response)
+        mock_get_session.return_value.get.side_effect = responses
+
+        get_json("http://example.com")
+        self.assertEqual(get_json("http://example.com", fresh=True),
+                         {"v": 2})
+        self.assertEqual(get_json("http://example.com"), {"v": 2})
+
+
+class TestStreaming(unittest.TestCase):
+    """Unit tests for incremental JSON array parsing"""
+
+    FIELDS = [("name",), ("license", "key")]
+
+    @parameterized.expand([
+        ("empty", []),
+        ("scalars", [1, 22, 3.5, "x", None, True]),
+        ("nested", [{"a": [1, {"b": "é"}]}, [], {}]),
+    ])
+    def test_any_chunking(self, _name, payload):
+        """Test every two-way split of the input parses the same"""
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        for cut in range(len(data) + 1):
+            chunks = [data[:cut], data[cut:]]
+            self.assertEqual(list(iter_json_array(chunks)), payload)
+
+    def test_byte_chunks(self):
+        """Test a real payload fed one byte at a time"""
+        data = json.dumps(repos_payload).encode()
+        chunks = (data[i:i + 1] for i in range(len(data)))
+        self.assertEqual(list(iter_json_array(chunks)), repos_payload)
+
+    def test_byte_chunks_scalars(self):
+        """Test strings, numbers and nested arrays one byte at a time"""
+        value = ["x" * 100 + "}]", 12345, [[1, 2], {"a": "]"}], None]
+        data = json.dumps(value).encode()
+        chunks = (data[i:i + 1] for i in range(len(data)))
+        self.assertEqual(list(iter_json_array(chunks)), value)
+
+    @parameterized.expand([
+        ("not_array", '{"a": 1}'),
+        ("truncated", '[{"a": 1}'),
+        ("trailing_comma", '[1, 2,]'),
+        ("trailing_data", '[1] 2'),
+    ])
+    def test_invalid(self, _name, text):
+        """Test malformed input raises JSONDecodeError"""
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array([text]))
+
+    def test_projection(self):
+        """Test fields keep only the requested key paths"""
+        repos = list(iter_json_array([json.dumps(repos_payload)],
+                                     self.FIELDS))
+        self.assertEqual(repos, [project(r, self.FIELDS)
+                                 for r in repos_payload])
+        self.assertEqual(repos[1], {"name": "cpp-netlib",
+                                    "license": {"key": "bsl-1.0"}})
+
+    def test_get_json_stream_follows_pages(self):
+        """Test get_json_stream streams every page in order"""
+        pages = {
+            "http://x/1": ('[{"n": 1}, {"n": 2}]', "http://x/2"),
+            "http://x/2": ('[{"n": 3}]', None),
+        }
+
+        def get(url, stream):
+            body, next_url = pages[url]
+            response = MagicMock(headers={})
+            response.__enter__.return_value = response
+            response.raw.stream.return_value = [body.encode()]
+            response.links = {"next": {"url": next_url}} if next_url else {}
+            return response
+
+        session = Mock()
+        session.get.side_effect = get
+        self.assertEqual([r["n"] for r in get_json_stream("http://x/1",
+                                                          session)],
+                         [1, 2, 3])
+
+    @parameterized.expand([
+        ("gzip", lambda b: gzip.compress(b)),
+        ("deflate", zlib.compress),
+    ])
+    def test_get_json_stream_decompresses(self, encoding, compress):
+        """Test encoded bodies are decoded chunk by chunk and counted"""
+        metrics = MetricsCollector()
+        set_instrumentation(metrics)
+        self.addCleanup(set_instrumentation, None)
+        body = json.dumps(repos_payload).encode()
+        wire = compress(body)
+        response = MagicMock(headers={"Content-Encoding": encoding},
+                             links={})
+        response.__enter__.return_value = response
+        response.raw.stream.return_value = [wire[i:i + 100]
+                                            for i in range(0, len(wire), 100)]
+        session = Mock()
+        session.get.return_value = response
+
+        self.assertEqual(list(get_json_stream("http://x/1", session)),
+                         repos_payload)
+        response.raw.stream.assert_called_once_with(
+            STREAM_CHUNK_SIZE, decode_content=False)
+        self.assertEqual(metrics.transfer,
+                         {("http://x/1", encoding): [len(wire), len(body)]})
+
+    def test_unsupported_encoding(self):
+        """Test an unknown Content-Encoding is refused"""
+        response = MagicMock(headers={"Content-Encoding": "zstd"})
+        response.__enter__.return_value = response
+        session = Mock()
+        session.get.return_value = response
+        with self.assertRaises(ValueError):
+            list(get_json_stream("http://x/1", session))
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Unit tests for the rate-limit-aware request scheduler"""
+
+    @staticmethod
+    def response(status=200, **headers):
+        """Build a mocked response"""
+        return Mock(status_code=status, headers=headers)
+
+    def test_retries_throttled(self):
+        """Test a 429 is retried after Retry-After"""
+        limiter = RateLimiter(rate=1000)
+        send = Mock(side_effect=[self.response(429, **{"Retry-After": "0"}),
+                                 self.response(200)])
+        self.assertEqual(limiter.request(send, "http://x").status_code, 200)
+        self.assertEqual(send.call_count, 2)
+
+    def test_gives_up_after_max_retries(self):
+        """Test the last throttled response is returned"""
+        limiter = RateLimiter(rate=1000, max_retries=2, base_delay=0)
+        send = Mock(return_value=self.response(
+            403, **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}))
+        self.assertEqual(limiter.request(send, "http://x").status_code, 403)
+        self.assertEqual(send.call_count, 3)
+
+    @patch('utils.random.uniform', return_value=1.0)
+    def test_backoff_is_exponential(self, _mock_uniform):
+        """Test backoff doubles per attempt up to max_delay"""
+        limiter = RateLimiter(base_delay=1, max_delay=5)
+        self.assertEqual([limiter.backoff(self.response(429), n)
+                          for n in range(4)], [1, 2, 4, 5])
+
+    def test_waits_for_reset(self):
+        """Test requests wait for the reset once the budget is spent"""
+        limiter = RateLimiter(rate=1000)
+        limiter.observe(self.response(**{
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(time.time() + 0.2)}))
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_reserve_is_kept_for_interactive(self):
+        """Test background requests stop at the reserve"""
+        limiter = RateLimiter(rate=1000, reserve=5)
+        limiter.observe(self.response(**{
+            "X-RateLimit-Remaining": "5",
+            "X-RateLimit-Reset": str(time.time() + 60)}))
+        limiter.acquire(INTERACTIVE)
+        self.assertEqual(limiter.remaining["core"], 4)
+        done = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (limiter.acquire(BACKGROUND), done.set()),
+            daemon=True)
+        thread.start()
+        self.assertFalse(done.wait(0.1))
+
+    def test_budgets_are_per_resource(self):
+        """Test a spent GraphQL budget does not hold back REST requests"""
+        limiter = RateLimiter(rate=1000)
+        limiter.observe(self.response(**{
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(time.time() + 60),
+            "X-RateLimit-Resource": "graphql"}))
+        limiter.observe(self.response(**{
+            "X-RateLimit-Remaining": "41",
+            "X-RateLimit-Reset": str(time.time() + 60)}))
+        self.assertEqual(limiter.remaining, {"graphql": 0, "core": 41})
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+        done = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (limiter.acquire(resource="graphql"),
+                            done.set()),
+            daemon=True)
+        thread.start()
+        self.assertFalse(done.wait(0.1))
+
+    @parameterized.expand([
+        ("reset", INTERACTIVE, "0"),
+        ("reserve", BACKGROUND, "5"),
+    ])
+    def test_waiter_on_spent_resource(self, _name, priority, remaining):
+        """Test a request held back on core does not block graphql"""
+        limiter = RateLimiter(rate=1000, reserve=5)
+        limiter.observe(self.response(**{
+            "X-RateLimit-Remaining": remaining,
+            "X-RateLimit-Reset": str(time.time() + 5)}))
+        held = threading.Thread(target=limiter.acquire,
+                                args=(priority, "core"), daemon=True)
+        held.start()
+        time.sleep(0.05)
+        done = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (limiter.acquire(priority, "graphql"),
+                            done.set()),
+            daemon=True)
+        thread.start()
+        self.assertTrue(done.wait(1))
+        self.assertTrue(held.is_alive())
+
+    @parameterized.expand([
+        ("https://api.github.com/graphql", "graphql"),
+        ("https://api.github.com/search/repositories?q=x", "search"),
+        ("https://api.github.com/orgs/google/repos", "core"),
+    ])
+    def test_rate_limit_resource(self, url, resource):
+        """Test requests are counted against the right resource"""
+        self.assertEqual(rate_limit_resource(url), resource)
+
+    def test_interactive_goes_first(self):
+        """Test a waiting interactive request overtakes background ones"""
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.acquire()
+        order = []
+
+        def run(priority):
+            with request_priority(priority):
+                limiter.acquire()
+            order.append(priority)
+
+        threads = [threading.Thread(target=run, args=(BACKGROUND,)),
+                   threading.Thread(target=run, args=(INTERACTIVE,))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+    @patch('utils.get_session')
+    def test_get_json_is_paced(self, mock_get_session):
+        """Test get_json goes through the configured limiter"""
+        limiter = RateLimiter(rate=1000)
+        set_rate_limiter(limiter)
+        self.addCleanup(set_rate_limiter, None)
+        response = mock_get_session.return_value.get.return_value
+        response.status_code = 200
+        response.headers = {"X-RateLimit-Remaining": "41",
+                            "X-RateLimit-Reset": "0"}
+        response.json.return_value = {"payload": True}
+
+        self.assertEqual(get_json("http://example.com"), {"payload": True})
+        self.assertEqual(limiter.remaining["core"], 41)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Unit tests for the instrumentation hooks"""
+
+    def setUp(self):
+        """Install a fresh collector"""
+        self.metrics = MetricsCollector(buckets=(0.1, 1.0))
+        set_instrumentation(self.metrics)
+        self.addCleanup(set_instrumentation, None)
+
+    @patch('utils.get_session')
+    def test_get_json(self, mock_get_session):
+        """Test requests, latency, bytes and decode time are recorded"""
+        response = mock_get_session.return_value.get.return_value
+        response.status_code = 200
+        response.content = b'{"payload": true}'
+        response.url = "http://example.com/orgs/a?page=2"
+        response.headers = {"Content-Encoding": "gzip"}
+        response.raw.tell.return_value = 30
+        response.json.return_value = {"payload": True}
+
+        get_json("http://example.com/orgs/a?page=2")
+        get_json("http://example.com/orgs/a")
+        url = "http://example.com/orgs/a"
+        self.assertEqual(self.metrics.requests, {(url, 200): 2})
+        self.assertEqual(self.metrics.bytes, {url: 34})
+        self.assertEqual(self.metrics.latency[url][:3], [2, 0, 0])
+        self.assertEqual(self.metrics.decode[url][0], 2)
+        self.assertEqual(self.metrics.transfer, {(url, "gzip"): [60, 34]})
+        text = self.metrics.prometheus()
+        self.assertIn('github_requests_total{url="%s",status="200"} 2'
+                      % url, text)
+        self.assertIn('github_request_duration_seconds_bucket'
+                      '{url="%s",le="+Inf"} 2' % url, text)
+
+    def test_memoize(self):
+        """Test hits and misses are counted per attribute"""
+        class TestClass:
+            @memoize
+            def plain(self):
+                return 42
+
+            @memoize(single_flight=True)
+            def shared(self):
+                return 43
+
+        obj = TestClass()
+        for _ in range(3):
+            obj.plain
+            obj.shared
+        self.assertEqual(self.metrics.memoize, {
+            ("TestInstrumentation.test_memoize.<locals>.TestClass.plain",
+             False): 1,
+            ("TestInstrumentation.test_memoize.<locals>.TestClass.plain",
+             True): 2,
+            ("TestInstrumentation.test_memoize.<locals>.TestClass.shared",
+             False): 1,
+            ("TestInstrumentation.test_memoize.<locals>.TestClass.shared",
+             True): 2,
+        })
+        self.assertIn('result="hit"} 2', self.metrics.prometheus())
+
 
 class TestMemoize(unittest.TestCase):
     """Unit tests for the memoize decorator"""
@@ -86,6 +732,152 @@ class TestMemoize(unittest.TestCase):
             # Ensure a_method was only called once
             mock_method.assert_called_once()
 
+    def test_memoize_single_flight(self):
+        """Test 64 concurrent cold readers trigger exactly one call"""
+        readers = 64
+        barrier = threading.Barrier(readers)
+        calls = []
+
+        class TestClass:
+            @memoize(single_flight=True)
+            def a_property(self):
+                calls.append(1)
+                time.sleep(0.05)
+                return object()
+
+        test_instance = TestClass()
+        results = []
+
+        def read():
+            barrier.wait()
+            results.append(test_instance.a_property)
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), readers)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_memoize_single_flight_retries_after_error(self):
+        """Test an exception is not cached in single-flight mode"""
+        outcomes = [KeyError("boom"), 42]
+
+        class TestClass:
+            @memoize(single_flight=True)
+            def a_property(self):
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        test_instance = TestClass()
+        with self.assertRaises(KeyError):
+            test_instance.a_property
+        self.assertEqual(test_instance.a_property, 42)
+
+    @patch('utils.time.monotonic')
+    def test_memoize_ttl(self, mock_monotonic):
+        """Test a value is recomputed once its TTL has elapsed"""
+        calls = []
+
+        class TestClass:
+            @memoize(ttl=10)
+            def a_property(self):
+                calls.append(1)
+                return len(calls)
+
+        test_instance = TestClass()
+        mock_monotonic.return_value = 100
+        self.assertEqual(test_instance.a_property, 1)
+        mock_monotonic.return_value = 109
+        self.assertEqual(test_instance.a_property, 1)
+        self.assertTrue(is_cached(test_instance, "a_property"))
+        mock_monotonic.return_value = 110
+        self.assertFalse(is_cached(test_instance, "a_property"))
+        self.assertEqual(test_instance.a_property, 2)
+
+    def test_invalidate(self):
+        """Test invalidation per attribute and per instance"""
+        calls = {"a": 0, "b": 0}
+
+        class TestClass:
+            @memoize
+            def a_property(self):
+                calls["a"] += 1
+                return calls["a"]
+
+            @memoize(single_flight=True)
+            def b_property(self):
+                calls["b"] += 1
+                return calls["b"]
+
+        test_instance = TestClass()
+        test_instance.a_property, test_instance.b_property
+        invalidate(test_instance, "a_property")
+        self.assertEqual(
+            (test_instance.a_property, test_instance.b_property), (2, 1))
+        invalidate(test_instance)
+        self.assertEqual(
+            (test_instance.a_property, test_instance.b_property), (3, 2))
+        with self.assertRaises(AttributeError):
+            invalidate(test_instance, "__class__")
+
+
+class TestAsyncMemoize(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for async_memoize and async_get_json"""
+
+    async def test_concurrent_access_shares_one_call(self):
+        """Test concurrent awaits of a memoized coroutine run it once"""
+        calls = []
+
+        class TestClass:
+            @async_memoize
+            async def a_property(self):
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                return 42
+
+        test_instance = TestClass()
+        results = await asyncio.gather(
+            *(test_instance.a_property for _ in range(10)))
+        self.assertEqual(results, [42] * 10)
+        self.assertEqual(await test_instance.a_property, 42)
+        self.assertEqual(len(calls), 1)
+
+    async def test_failure_is_retried(self):
+        """Test a failed coroutine is not cached"""
+        outcomes = [KeyError("boom"), 42]
+
+        class TestClass:
+            @async_memoize
+            async def a_property(self):
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        test_instance = TestClass()
+        with self.assertRaises(KeyError):
+            await test_instance.a_property
+        self.assertEqual(await test_instance.a_property, 42)
+
+    @patch('utils.get_json')
+    async def test_async_get_json_single_flight(self, mock_get_json):
+        """Test concurrent async_get_json calls share one request"""
+        def slow_get_json(url, session):
+            time.sleep(0.05)
+            return {"url": url}
+
+        mock_get_json.side_effect = slow_get_json
+        results = await asyncio.gather(
+            *(async_get_json("http://example.com") for _ in range(5)))
+        self.assertEqual(results, [{"url": "http://example.com"}] * 5)
+        mock_get_json.assert_called_once_with("http://example.com", None)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,22 +1,107 @@
 #!/usr/bin/env python3
 """Generic utilities for github org client.
 """
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
 import requests
-from functools import wraps
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import lru_cache, wraps
+from heapq import heapify, heappop, heappush
+from itertools import count
+from requests.adapters import HTTPAdapter
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+try:
+    import brotli
+except ImportError:
+    brotli = None
 from typing import (
     Mapping,
     Sequence,
     Any,
     Dict,
     Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
 )
 
 __all__ = [
+    "BACKGROUND",
+    "ENCODINGS",
+    "INTERACTIVE",
+    "Instrumentation",
+    "LRUCache",
+    "MetricsCollector",
+    "RateLimiter",
+    "ResponseCache",
     "access_nested_map",
+    "async_get_json",
+    "async_get_json_pages",
+    "async_memoize",
+    "compile_path",
+    "extract_columns",
     "get_json",
+    "get_json_pages",
+    "get_json_stream",
+    "get_session",
+    "invalidate",
+    "is_cached",
+    "iter_json_array",
+    "make_session",
     "memoize",
+    "post_json",
+    "prime",
+    "project",
+    "rate_limit_resource",
+    "request_priority",
+    "set_instrumentation",
+    "set_rate_limiter",
+    "set_response_cache",
+    "set_session",
+    "set_url_cache",
 ]
 
+DEFAULT_POOL_MAXSIZE = 10
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_response_cache: Optional["ResponseCache"] = None
+_url_cache: Optional["LRUCache"] = None
+_rate_limiter: Optional["RateLimiter"] = None
+_instrumentation: Optional["Instrumentation"] = None
+
+INTERACTIVE = 0
+BACKGROUND = 1
+_priority: ContextVar[int] = ContextVar("request_priority",
+                                        default=INTERACTIVE)
+_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+_MISSING = object()
+_EXPIRY = "_memoize_expiry"
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(" \t\n\r,]")
+_CLOSERS = {"{": "}", "[": "]", '"': '"'}
+STREAM_CHUNK_SIZE = 64 << 10
+ENCODINGS: Tuple[str, ...] = ("gzip", "deflate") + \
+    (("br",) if brotli is not None else ())
+
 
 def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     """Access nested map with key path.
@@ -40,15 +125,1102 @@ def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     return nested_map
 
 
-def get_json(url: str) -> Dict:
+@lru_cache(maxsize=1024)
+def _compile_path(path: Tuple) -> Callable[[Mapping], Any]:
+    """Build the accessor for a hashable path"""
+    def accessor(nested_map: Mapping) -> Any:
+        """Access nested map along a precompiled path"""
+        for key in path:
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                raise KeyError(key)
+            nested_map = nested_map[key]
+        return nested_map
+
+    return accessor
+
+
+def compile_path(path: Sequence) -> Callable[[Mapping], Any]:
+    """Precompile a key path into a fast accessor.
+    The accessor behaves exactly like `access_nested_map` with that
+    path, KeyError included, but skips the Mapping ABC check for plain
+    dicts. Accessors are cached by path, so repeated calls are cheap.
+    Example
+    -------
+    >>> license_key = compile_path(("license", "key"))
+    >>> license_key({"license": {"key": "mit"}})
+    'mit'
+    """
+    return _compile_path(tuple(path))
+
+
+def extract_columns(records: Iterable[Mapping], paths: Sequence[Sequence],
+                    default: Any = None,
+                    typecodes: Optional[Mapping[Tuple, str]] = None,
+                    ) -> Dict[Tuple, Any]:
+    """Pull several key paths out of many records in one pass.
+    Returns one column per path, keyed by the path as a tuple. Records
+    where a path is missing get `default`. Columns named in `typecodes`
+    are packed into `array.array`s of that typecode (give a numeric
+    `default` for those); the rest are lists.
+    Example
+    -------
+    >>> columns = extract_columns(
+    ...     repos, [("name",), ("license", "key"), ("stargazers_count",)],
+    ...     default=0, typecodes={("stargazers_count",): "q"})
+    >>> columns[("stargazers_count",)]
+    array('q', [9, 310, ...])
+    """
+    keys = [tuple(path) for path in paths]
+    columns: List[List] = [[] for _ in keys]
+    getters = list(zip([compile_path(key) for key in keys],
+                       [column.append for column in columns]))
+    for record in records:
+        for get, append in getters:
+            try:
+                append(get(record))
+            except KeyError:
+                append(default)
+    typecodes = typecodes or {}
+    return {
+        key: array(typecodes[key], column) if key in typecodes else column
+        for key, column in zip(keys, columns)
+    }
+
+
+def make_session(pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_connections: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = False,
+                 accept_encoding: Optional[Sequence[str]] = None,
+                 ) -> requests.Session:
+    """Build a keep-alive session with a bounded connection pool.
+    Parameters
+    ----------
+    pool_maxsize: int
+        maximum number of kept-alive connections per host
+    pool_connections: int
+        number of distinct hosts to keep a pool for
+    pool_block: bool
+        wait for a free connection instead of opening an extra one,
+        capping concurrent requests per host at `pool_maxsize`
+    accept_encoding: Sequence[str]
+        content encodings to offer, most preferred first, out of
+        `ENCODINGS` and "identity"; empty or ("identity",) turns
+        compression off. None keeps the requests default.
+    """
+    session = requests.Session()
+    if accept_encoding is not None:
+        unsupported = set(accept_encoding) - set(ENCODINGS) - {"identity"}
+        if unsupported:
+            raise ValueError("Unsupported encodings: {}".format(
+                ", ".join(sorted(unsupported))))
+        session.headers["Accept-Encoding"] = \
+            ", ".join(accept_encoding) or "identity"
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          pool_block=pool_block)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def set_session(session: Optional[requests.Session]) -> None:
+    """Inject the session used by get_json.
+    Passing None drops the current session so the next call
+    builds a fresh default one.
+    """
+    global _session
+    with _session_lock:
+        _session = session
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed requests at INTERACTIVE or BACKGROUND priority.
+    Example
+    -------
+    >>> with request_priority(BACKGROUND):
+    ...     client.sync_repos()
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def rate_limit_resource(url: str) -> str:
+    """The GitHub rate-limit resource a request to url counts against.
+    Example
+    -------
+    >>> rate_limit_resource("https://api.github.com/graphql")
+    'graphql'
+    """
+    path = urlsplit(url).path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if path.startswith("/search/"):
+        return "search"
+    return "core"
+
+
+class RateLimiter:
+    """Paces requests to stay inside the server's rate limit.
+    A token bucket allows `rate` requests per second with bursts of
+    `burst`. `X-RateLimit-Remaining`/`X-RateLimit-Reset` response
+    headers are tracked per `X-RateLimit-Resource` ("core" for REST,
+    "graphql", "search"), so that, once a resource's budget is spent,
+    requests against it wait for its reset while the others go on;
+    BACKGROUND requests already stop when only `reserve` requests are
+    left, keeping those for INTERACTIVE ones. Each resource queues its
+    own waiters, INTERACTIVE first, so a request held back by one
+    resource's budget never blocks requests against another. A 429, or
+    a 403 with no budget left, pauses the requests of that resource for
+    `Retry-After`, the reset, or a jittered exponential backoff, then
+    is retried up to `max_retries` times.
+    Example
+    -------
+    >>> set_rate_limiter(RateLimiter(rate=10, burst=20, reserve=100))
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 10,
+                 reserve: int = 0, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        """Init method of RateLimiter"""
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.remaining: Dict[str, int] = {}
+        self.reset_at: Dict[str, float] = {}
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._paused_until: Dict[str, float] = {}
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {}
+        self._tickets = count()
+        self._cond = threading.Condition()
+
+    def _wait_time(self, priority: int, resource: str) -> float:
+        """Seconds until a request at priority may go; lock held"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens
+                           + (now - self._refilled) * self.rate)
+        self._refilled = now
+        wait = max(self._paused_until.get(resource, 0.0) - now,
+                   (1 - self._tokens) / self.rate)
+        floor = self.reserve if priority > INTERACTIVE else 0
+        remaining = self.remaining.get(resource)
+        if remaining is not None and remaining <= floor:
+            until_reset = self.reset_at[resource] - time.time()
+            if until_reset > 0:
+                wait = max(wait, until_reset)
+            else:
+                del self.remaining[resource]
+        return wait
+
+    def acquire(self, priority: Optional[int] = None,
+                resource: str = "core") -> None:
+        """Block until a request against resource may be sent"""
+        if priority is None:
+            priority = _priority.get()
+        with self._cond:
+            waiting = self._waiting.setdefault(resource, [])
+            ticket = (priority, next(self._tickets))
+            heappush(waiting, ticket)
+            try:
+                while True:
+                    wait = self._wait_time(priority, resource) \
+                        if waiting[0] == ticket else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                waiting.remove(ticket)
+                heapify(waiting)
+                self._cond.notify_all()
+            self._tokens -= 1
+            if resource in self.remaining:
+                self.remaining[resource] -= 1
+
+    def observe(self, response: requests.Response,
+                resource: str = "core") -> str:
+        """Update the budget from rate-limit response headers and
+        return the resource they were for (`resource` unless the
+        response names another).
+        """
+        headers = response.headers
+        resource = headers.get("X-RateLimit-Resource") or resource
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return resource
+        with self._cond:
+            self.remaining[resource] = remaining
+            self.reset_at[resource] = reset_at
+            self._cond.notify_all()
+        return resource
+
+    def backoff(self, response: requests.Response, attempt: int,
+                resource: str = "core") -> float:
+        """Seconds to pause after a throttled response"""
+        try:
+            return max(0.0, float(response.headers["Retry-After"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+        reset_at = self.reset_at.get(resource, 0.0)
+        if self.remaining.get(resource) == 0 and reset_at > time.time():
+            return min(self.max_delay, reset_at - time.time())
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def throttled(self, response: requests.Response) -> bool:
+        """Whether response is a rate-limit rejection"""
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 \
+            and response.headers.get("X-RateLimit-Remaining") == "0"
+
+    def request(self, send: Callable, url: str, **kwargs: Any) -> Any:
+        """Send `send(url, **kwargs)` paced, retrying when throttled"""
+        resource = rate_limit_resource(url)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(resource=resource)
+            response = send(url, **kwargs)
+            resource = self.observe(response, resource)
+            if attempt == self.max_retries or not self.throttled(response):
+                return response
+            delay = self.backoff(response, attempt, resource)
+            with self._cond:
+                self._paused_until[resource] = max(
+                    self._paused_until.get(resource, 0.0),
+                    time.monotonic() + delay)
+            response.close()
+        return response
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Pace every get_json request through limiter (None disables it)"""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+class Instrumentation:
+    """Receiver of request, JSON decode and memoize events.
+    Every hook is a no-op; subclass and override the ones you need,
+    then install an instance with `set_instrumentation`. Hooks run on
+    the calling thread, so they must be cheap and thread-safe.
+    """
+
+    def on_request(self, url: str, status: int, seconds: float,
+                   size: int) -> None:
+        """A response from url arrived after `seconds`, carrying a
+        body of `size` bytes (its Content-Length when streamed).
+        Throttled attempts retried by the rate limiter count too.
+        """
+
+    def on_decode(self, url: str, seconds: float) -> None:
+        """The JSON body of url took `seconds` to decode"""
+
+    def on_transfer(self, url: str, encoding: str, wire: int,
+                    decoded: int) -> None:
+        """The body of url took `wire` bytes on the wire in `encoding`
+        and `decoded` bytes once decompressed.
+        """
+
+    def on_memoize(self, name: str, hit: bool) -> None:
+        """The memoized property `name` (a qualified name such as
+        "GithubOrgClient.org") was read, from cache or not.
+        """
+
+
+class MetricsCollector(Instrumentation):
+    """In-memory Instrumentation that renders Prometheus text format.
+    URLs are aggregated without their query string, so every page of
+    an org's repos counts under one endpoint.
+    Example
+    -------
+    >>> metrics = MetricsCollector()
+    >>> set_instrumentation(metrics)
+    >>> GithubOrgClient("google").public_repos()
+    >>> print(metrics.prometheus())
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0)
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS) -> None:
+        """Init method of MetricsCollector"""
+        self.buckets = tuple(sorted(buckets))
+        self.requests: Dict[Tuple[str, int], int] = {}
+        self.latency: Dict[str, List[float]] = {}
+        self.bytes: Dict[str, int] = {}
+        self.decode: Dict[str, List[float]] = {}
+        self.transfer: Dict[Tuple[str, str], List[int]] = {}
+        self.memoize: Dict[Tuple[str, bool], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """url without its query string or fragment"""
+        parts = urlsplit(url)
+        return urlunsplit(parts._replace(query="", fragment=""))
+
+    def on_request(self, url: str, status: int, seconds: float,
+                   size: int) -> None:
+        """Count the request, its latency and its bytes"""
+        url = self.endpoint(url)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            key = (url, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get(url)
+            if histogram is None:
+                histogram = self.latency[url] = \
+                    [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+            self.bytes[url] = self.bytes.get(url, 0) + size
+
+    def on_decode(self, url: str, seconds: float) -> None:
+        """Add to the decode count and time of url"""
+        url = self.endpoint(url)
+        with self._lock:
+            total = self.decode.setdefault(url, [0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+
+    def on_transfer(self, url: str, encoding: str, wire: int,
+                    decoded: int) -> None:
+        """Add to the wire and decoded bytes of url"""
+        key = (self.endpoint(url), encoding)
+        with self._lock:
+            total = self.transfer.setdefault(key, [0, 0])
+            total[0] += wire
+            total[1] += decoded
+
+    def on_memoize(self, name: str, hit: bool) -> None:
+        """Count a hit or miss of name"""
+        with self._lock:
+            key = (name, hit)
+            self.memoize[key] = self.memoize.get(key, 0) + 1
+
+    def prometheus(self) -> str:
+        """Every metric in Prometheus text exposition format"""
+        def labels(**pairs: Any) -> str:
+            return ",".join('{}="{}"'.format(k, str(v).replace(
+                "\\", "\\\\").replace('"', '\\"'))
+                for k, v in pairs.items())
+
+        lines = [
+            "# HELP github_requests_total HTTP requests by URL and status.",
+            "# TYPE github_requests_total counter",
+        ]
+        with self._lock:
+            for (url, status), n in sorted(self.requests.items()):
+                lines.append("github_requests_total{{{}}} {}".format(
+                    labels(url=url, status=status), n))
+            lines += [
+                "# HELP github_request_duration_seconds HTTP latency.",
+                "# TYPE github_request_duration_seconds histogram",
+            ]
+            for url, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), histogram):
+                    cumulative += n
+                    lines.append(
+                        "github_request_duration_seconds_bucket{{{}}} {}"
+                        .format(labels(url=url, le=bound), cumulative))
+                lines.append("github_request_duration_seconds_sum{{{}}} {}"
+                             .format(labels(url=url), histogram[-1]))
+                lines.append(
+                    "github_request_duration_seconds_count{{{}}} {}"
+                    .format(labels(url=url), cumulative))
+            lines += [
+                "# HELP github_response_bytes_total Response body bytes.",
+                "# TYPE github_response_bytes_total counter",
+            ]
+            for url, size in sorted(self.bytes.items()):
+                lines.append("github_response_bytes_total{{{}}} {}".format(
+                    labels(url=url), size))
+            lines += [
+                "# HELP github_json_decode_seconds JSON decode time.",
+                "# TYPE github_json_decode_seconds summary",
+            ]
+            for url, (n, seconds) in sorted(self.decode.items()):
+                lines.append("github_json_decode_seconds_sum{{{}}} {}"
+                             .format(labels(url=url), seconds))
+                lines.append("github_json_decode_seconds_count{{{}}} {}"
+                             .format(labels(url=url), n))
+            for metric, index, text in (
+                    ("wire", 0, "as transferred"),
+                    ("decoded", 1, "after decompression")):
+                lines += [
+                    "# HELP github_response_{}_bytes_total Response body "
+                    "bytes {}.".format(metric, text),
+                    "# TYPE github_response_{}_bytes_total counter"
+                    .format(metric),
+                ]
+                for (url, encoding), total in sorted(self.transfer.items()):
+                    lines.append(
+                        "github_response_{}_bytes_total{{{}}} {}".format(
+                            metric, labels(url=url, encoding=encoding),
+                            total[index]))
+            lines += [
+                "# HELP memoize_lookups_total Memoized property reads.",
+                "# TYPE memoize_lookups_total counter",
+            ]
+            for (name, hit), n in sorted(self.memoize.items()):
+                lines.append("memoize_lookups_total{{{}}} {}".format(
+                    labels(attr=name, result="hit" if hit else "miss"), n))
+        return "\n".join(lines) + "\n"
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]) -> None:
+    """Report get_json and memoize events to instrumentation
+    (None, the default, reports nothing).
+    """
+    global _instrumentation
+    _instrumentation = instrumentation
+
+
+def _timed(method: Callable, instrumentation: Instrumentation) -> Callable:
+    """A session method, reporting each response to instrumentation"""
+    def send(url: str, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        response = method(url, **kwargs)
+        seconds = time.perf_counter() - start
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+            instrumentation.on_transfer(
+                url, _content_encoding(response),
+                _wire_bytes(response, size), size)
+        instrumentation.on_request(url, response.status_code, seconds,
+                                   size)
+        return response
+    return send
+
+
+def _content_encoding(response: requests.Response) -> str:
+    """Normalized Content-Encoding of response"""
+    return response.headers.get("Content-Encoding", "identity").lower() \
+        .replace(" ", "") or "identity"
+
+
+def _wire_bytes(response: requests.Response, default: int) -> int:
+    """Bytes read off the connection for a fully read response"""
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def _decoder(encoding: str) -> Optional[Callable[[bytes], bytes]]:
+    """Incremental decompressor for a Content-Encoding header value,
+    None when the body is not encoded.
+    """
+    steps = []
+    for name in reversed(encoding.lower().split(",")):
+        name = name.strip()
+        if name in ("", "identity"):
+            continue
+        if name in ("gzip", "x-gzip"):
+            steps.append(zlib.decompressobj(16 + zlib.MAX_WBITS).decompress)
+        elif name == "deflate":
+            steps.append(zlib.decompressobj().decompress)
+        elif name == "br" and brotli is not None:
+            steps.append(brotli.Decompressor().process)
+        else:
+            raise ValueError("Unsupported Content-Encoding: " + name)
+    if not steps:
+        return None
+    if len(steps) == 1:
+        return steps[0]
+
+    def decode(data: bytes) -> bytes:
+        for step in steps:
+            data = step(data)
+        return data
+    return decode
+
+
+def _iter_decoded(response: requests.Response, chunk_size: int,
+                  counts: List[int]) -> Iterator[bytes]:
+    """Decompress a streamed response body chunk by chunk as it
+    downloads, adding wire and decoded byte counts to `counts`.
+    """
+    decode = _decoder(response.headers.get("Content-Encoding", ""))
+    for chunk in response.raw.stream(chunk_size, decode_content=False):
+        counts[0] += len(chunk)
+        if decode is not None:
+            chunk = decode(chunk)
+        counts[1] += len(chunk)
+        if chunk:
+            yield chunk
+
+
+def _send(method: Callable, url: str, **kwargs: Any) -> Any:
+    """method(url), a session method, through the rate limiter if one
+    is set.
+    """
+    instrumentation = _instrumentation
+    send = method if instrumentation is None \
+        else _timed(method, instrumentation)
+    limiter = _rate_limiter
+    if limiter is None:
+        return send(url, **kwargs)
+    return limiter.request(send, url, **kwargs)
+
+
+def _get(session: requests.Session, url: str, **kwargs: Any) -> Any:
+    """session.get(url), through the rate limiter if one is set"""
+    return _send(session.get, url, **kwargs)
+
+
+def _decode(response: requests.Response) -> Any:
+    """response.json(), timed when instrumentation is set"""
+    instrumentation = _instrumentation
+    if instrumentation is None:
+        return response.json()
+    start = time.perf_counter()
+    body = response.json()
+    instrumentation.on_decode(response.url,
+                              time.perf_counter() - start)
+    return body
+
+
+class CacheEntry(NamedTuple):
+    """A cached response: validators plus the already parsed body"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: Any
+    links: Dict
+    size: int
+    status: int = 200
+
+
+class ResponseCache:
+    """On-disk conditional request cache keyed by URL.
+    Responses carrying an `ETag` or `Last-Modified` header are stored
+    as JSON with their parsed body. Later fetches of the same URL send
+    `If-None-Match`/`If-Modified-Since`, and a 304 returns the stored
+    body without decoding anything. The most recently used entries are
+    also kept in memory, up to `memory_entries` entries and
+    `memory_bytes` body bytes.
+    Example
+    -------
+    >>> cache = ResponseCache("~/.cache/github")
+    >>> set_response_cache(cache)
+    >>> org = get_json("https://api.github.com/orgs/google")
+    >>> org = get_json("https://api.github.com/orgs/google")
+    >>> cache.stats()["hits"]
+    1
+    """
+
+    def __init__(self, directory: str, memory_entries: int = 256,
+                 memory_bytes: int = 16 << 20) -> None:
+        """Init method of ResponseCache"""
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = LRUCache(max_entries=memory_entries,
+                                 max_bytes=memory_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+
+    def _path(self, url: str) -> str:
+        """File holding the entry for url"""
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, name + ".json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the stored entry for url, if any"""
+        entry = self._entries.get(url)
+        if entry is None:
+            try:
+                with open(self._path(url), encoding="utf-8") as f:
+                    entry = CacheEntry(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                return None
+            self._entries.put(url, entry, entry.size)
+        return entry
+
+    def put(self, url: str, entry: CacheEntry) -> None:
+        """Store entry for url, replacing the file atomically"""
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry._asdict(), f, separators=(",", ":"))
+        os.replace(tmp, self._path(url))
+        self._entries.put(url, entry, entry.size)
+
+    def fetch(self, session: requests.Session, url: str) -> CacheEntry:
+        """Conditionally GET url, returning the entry now describing it"""
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        response = _get(session, url, headers=headers)
+        if entry is not None and response.status_code == 304:
+            with self._lock:
+                self.hits += 1
+                self.revalidated += 1
+                self.bytes_saved += entry.size
+            return entry
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self.revalidated += 1
+        body = _decode(response)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        entry = CacheEntry(etag, last_modified, body, response.links,
+                           len(response.content), response.status_code)
+        if response.status_code == 200 and (etag or last_modified):
+            self.put(url, entry)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for 304s served from the cache (hits), bodies that
+        had to be downloaded (misses), conditional requests sent
+        (revalidated) and the body bytes the hits avoided.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Put a ResponseCache under get_json (None disables caching)"""
+    global _response_cache
+    _response_cache = cache
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes.
+    Used through `set_url_cache` it is shared by every get_json caller
+    in the process, so separate GithubOrgClient instances reuse each
+    other's payloads. Entries older than `ttl` seconds are treated as
+    missing.
+    Example
+    -------
+    >>> set_url_cache(LRUCache(max_entries=1024, max_bytes=64 << 20))
+    """
+
+    def __init__(self, max_entries: int = 1024,
+                 max_bytes: int = 64 << 20,
+                 ttl: Optional[float] = None) -> None:
+        """Init method of LRUCache"""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = \
+            OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """Return the value for key, or None, marking it recently used"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl is not None \
+                    and item[2] + self.ttl <= time.monotonic():
+                self._remove(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        """Store value as costing size bytes, evicting as needed.
+        A value larger than max_bytes is not stored, but still drops
+        the entry it replaces.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries \
+                    or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Drop key; the caller holds the lock"""
+        self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def set_url_cache(cache: Optional[LRUCache]) -> None:
+    """Share an LRUCache of 2xx payloads across all get_json callers
+    (None disables it). Entries live until evicted unless the cache
+    has a `ttl`; pass `fresh=True` to get_json to skip them.
+    """
+    global _url_cache
+    _url_cache = cache
+
+
+def _fetch(url: str, session: Optional[requests.Session],
+           fresh: bool = False) -> Tuple[Any, Dict]:
+    """GET url through the URL and response caches if they are set.
+    With `fresh`, the URL cache is not read, only updated. Only 2xx
+    bodies are put in the URL cache. Returns the parsed body and the
+    parsed `Link` header.
+    """
+    url_cache = _url_cache
+    if url_cache is not None and not fresh:
+        cached = url_cache.get(url)
+        if cached is not None:
+            return cached
+    session = session or get_session()
+    if _response_cache is not None:
+        entry = _response_cache.fetch(session, url)
+        body, links, size = entry.body, entry.links, entry.size
+        status = entry.status
+    else:
+        response = _get(session, url)
+        body, links = _decode(response), response.links
+        if url_cache is not None:
+            size, status = len(response.content), response.status_code
+    if url_cache is not None and 200 <= status < 300:
+        url_cache.put(url, (body, links), size)
+    return body, links
+
+
+def get_json(url: str, session: Optional[requests.Session] = None,
+             fresh: bool = False) -> Dict:
     """Get JSON from remote URL.
+    Connections are reused through `session`, or the process-wide
+    session from `get_session` when none is given. With `fresh`, the
+    shared URL cache is bypassed (and refreshed with the new body).
+    """
+    return _fetch(url, session, fresh)[0]
+
+
+def post_json(url: str, payload: Any,
+              session: Optional[requests.Session] = None,
+              headers: Optional[Dict[str, str]] = None) -> Any:
+    """POST payload as JSON to url and return the decoded reply.
+    Goes through the session, rate limiter and instrumentation like
+    get_json, but never through the caches.
+    """
+    session = session or get_session()
+    response = _send(session.post, url, json=payload, headers=headers)
+    response.raise_for_status()
+    return _decode(response)
+
+
+def _page_urls(next_url: str, last_url: str) -> Optional[List[str]]:
+    """Expand the pages between a `next` and `last` link, inclusive.
+    Returns None when the links do not carry a numeric `page` query.
+    """
+    next_parts, last_parts = urlsplit(next_url), urlsplit(last_url)
+    query = parse_qs(next_parts.query)
+    try:
+        first = int(query["page"][0])
+        last = int(parse_qs(last_parts.query)["page"][0])
+    except (KeyError, ValueError):
+        return None
+    urls = []
+    for page in range(first, last + 1):
+        query["page"] = [str(page)]
+        urls.append(urlunsplit(
+            next_parts._replace(query=urlencode(query, doseq=True))))
+    return urls
+
+
+def get_json_pages(url: str,
+                   session: Optional[requests.Session] = None,
+                   prefetch: int = 0, fresh: bool = False) -> Iterator[Any]:
+    """Lazily yield the JSON body of every page of a paginated URL.
+    Pages are discovered through the `Link: rel="next"` header. With
+    `prefetch` > 0 and a `rel="last"` link, up to `prefetch` upcoming
+    pages are fetched concurrently while earlier ones are consumed;
+    pages are always yielded in order. `fresh` bypasses the URL cache
+    as in get_json.
+    Example
+    -------
+    >>> repos = [repo for page in get_json_pages(url) for repo in page]
+    """
+    session = session or get_session()
+    body, links = _fetch(url, session, fresh)
+    yield body
+    if prefetch > 0 and "next" in links and "last" in links:
+        urls = _page_urls(links["next"]["url"], links["last"]["url"])
+        if urls is not None:
+            with ThreadPoolExecutor(max_workers=prefetch) as pool:
+                pending = deque()
+                for page_url in urls:
+                    if len(pending) >= prefetch:
+                        yield pending.popleft().result()
+                    pending.append(pool.submit(
+                        copy_context().run, get_json, page_url, session,
+                        fresh))
+                while pending:
+                    yield pending.popleft().result()
+            return
+    while "next" in links:
+        body, links = _fetch(links["next"]["url"], session, fresh)
+        yield body
+
+
+def project(record: Mapping, fields: Sequence[Sequence]) -> Dict:
+    """Copy only the given key paths of record, keeping their nesting.
+    Paths missing from record are left out.
+    Example
+    -------
+    >>> project({"name": "x", "license": {"key": "mit", "url": "..."}},
+    ...         [("name",), ("license", "key")])
+    {'name': 'x', 'license': {'key': 'mit'}}
     """
-    response = requests.get(url)
-    return response.json()
+    projected: Dict = {}
+    for path in fields:
+        try:
+            value = compile_path(path)(record)
+        except KeyError:
+            continue
+        target = projected
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return projected
+
+
+def iter_json_array(chunks: Iterable[Any],
+                    fields: Optional[Sequence[Sequence]] = None,
+                    ) -> Iterator[Any]:
+    """Incrementally parse a JSON array, yielding one element at a time.
+    `chunks` may be bytes (UTF-8) or str. Only the element being parsed
+    and the unread input are held in memory. An incomplete element is
+    only parsed again once a chunk brings a character that could close
+    it, so small chunks do not re-parse it over and over. With
+    `fields`, each element is reduced with `project` as soon as it is
+    parsed.
+    Raises json.JSONDecodeError if the input is not a single array.
+    Example
+    -------
+    >>> list(iter_json_array([b'[{"a": 1}, {"a"', b': 2}]']))
+    [{'a': 1}, {'a': 2}]
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, state = "", 0, "start"
+    chunks = iter(chunks)
+    eof = False
+    retry_on = ""
+    pending: List[str] = []
+    while not eof:
+        chunk = next(chunks, None)
+        eof = chunk is None
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = utf8.decode(chunk)
+        elif eof:
+            chunk = utf8.decode(b"", final=True)
+        if retry_on and not eof and retry_on not in chunk:
+            # The element cannot be complete yet; don't re-parse it
+            pending.append(chunk)
+            continue
+        if pending:
+            chunk, pending = "".join(pending) + chunk, []
+        retry_on = ""
+        buf, pos = buf[pos:] + chunk, 0
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            char = buf[pos]
+            if state == "start":
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buf, pos)
+                state, pos = "first", pos + 1
+            elif state == "first" and char == "]":
+                state, pos = "done", pos + 1
+            elif state in ("first", "value"):
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    retry_on = _CLOSERS.get(char, "")
+                    break
+                if not eof and (end == len(buf)
+                                or buf[end] not in _DELIMITERS):
+                    break
+                yield value if fields is None else project(value, fields)
+                state, pos = "separator", end
+            elif state == "separator" and char in ",]":
+                state, pos = ("value" if char == "," else "done"), pos + 1
+            else:
+                raise json.JSONDecodeError("Unexpected data", buf, pos)
+    if state != "done":
+        raise json.JSONDecodeError("Unterminated array", buf, len(buf))
+
 
+def get_json_stream(url: str,
+                    session: Optional[requests.Session] = None,
+                    fields: Optional[Sequence[Sequence]] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """Stream the elements of a paginated JSON array one at a time.
+    Each page body is decompressed and parsed incrementally with
+    `iter_json_array` while it downloads, and `Link: rel="next"` is
+    followed. Streaming bypasses the URL and response caches.
+    Example
+    -------
+    >>> for repo in get_json_stream(url, fields=[("name",)]):
+    ...     print(repo["name"])
+    """
+    session = session or get_session()
+    while url:
+        with _get(session, url, stream=True) as response:
+            response.raise_for_status()
+            counts = [0, 0]
+            yield from iter_json_array(
+                _iter_decoded(response, chunk_size, counts), fields)
+            instrumentation = _instrumentation
+            if instrumentation is not None:
+                instrumentation.on_transfer(
+                    url, _content_encoding(response), *counts)
+            url = response.links.get("next", {}).get("url")
+
+
+async def _single_flight(key: str, fn: Callable, *args: Any) -> Any:
+    """Run blocking fn(*args) in a worker thread, sharing the result
+    with every concurrent caller that uses the same key.
+    """
+    inflight_key = (asyncio.get_running_loop(), key)
+    future = _inflight.get(inflight_key)
+    if future is None:
+        future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        _inflight[inflight_key] = future
+        future.add_done_callback(
+            lambda _: _inflight.pop(inflight_key, None))
+    return await asyncio.shield(future)
 
-def memoize(fn: Callable) -> Callable:
+
+async def async_get_json(url: str,
+                         session: Optional[requests.Session] = None) -> Any:
+    """Get JSON from remote URL without blocking the event loop.
+    Concurrent calls for the same URL share one request.
+    """
+    return await _single_flight(url, get_json, url, session)
+
+
+def _all_pages(url: str, session: Optional[requests.Session],
+               prefetch: int) -> List[Any]:
+    """Fetch every page of url into a list"""
+    return list(get_json_pages(url, session, prefetch))
+
+
+async def async_get_json_pages(url: str,
+                               session: Optional[requests.Session] = None,
+                               prefetch: int = 0) -> List[Any]:
+    """Get the JSON body of every page of url without blocking the
+    event loop. Concurrent calls for the same URL share one request.
+    """
+    return await _single_flight(
+        "pages:" + url, _all_pages, url, session, prefetch)
+
+
+def async_memoize(fn: Callable) -> Callable:
+    """Decorator to memoize a coroutine method as an awaitable property.
+    The first access schedules the coroutine; every access, including
+    concurrent ones, awaits that same task. A failed task is dropped
+    so the next access retries.
+    Example
+    -------
+    class MyClass:
+        @async_memoize
+        async def a_method(self):
+            print("a_method called")
+            return 42
+    >>> my_object = MyClass()
+    >>> await my_object.a_method
+    a_method called
+    42
+    >>> await my_object.a_method
+    42
+    """
+    attr_name = "_{}".format(fn.__name__)
+
+    @wraps(fn)
+    def memoized(self):
+        """"memoized wraps"""
+        task = getattr(self, attr_name, None)
+        if task is None:
+            task = asyncio.ensure_future(fn(self))
+            setattr(self, attr_name, task)
+
+            def forget_failure(done: asyncio.Future) -> None:
+                if (done.cancelled() or done.exception() is not None) \
+                        and getattr(self, attr_name, None) is done:
+                    delattr(self, attr_name)
+
+            task.add_done_callback(forget_failure)
+        return task
+
+    memoized.memoized_attr = attr_name
+    return property(memoized)
+
+
+def memoize(fn: Optional[Callable] = None, *,
+            single_flight: bool = False,
+            ttl: Union[None, float, Callable[[Any], Optional[float]]] = None,
+            ) -> Callable:
     """Decorator to memoize a method.
+    With `single_flight=True` the method runs at most once per instance
+    even when many threads read the property while it is still cold;
+    the others wait on a per-instance, per-attribute lock and share the
+    result. Once cached, reads take no lock.
+    `ttl` expires the cached value after that many seconds. It may also
+    be a callable taking the instance, so each instance can choose its
+    own TTL (None meaning never). Use `invalidate` to drop values early.
     Example
     -------
     class MyClass:
@@ -56,6 +1228,10 @@ def memoize(fn: Callable) -> Callable:
         def a_method(self):
             print("a_method called")
             return 42
+
+        @memoize(single_flight=True, ttl=60)
+        def shared(self):
+            return 43
     >>> my_object = MyClass()
     >>> my_object.a_method
     a_method called
@@ -63,13 +1239,125 @@ def memoize(fn: Callable) -> Callable:
     >>> my_object.a_method
     42
     """
+    if fn is None:
+        return lambda f: memoize(f, single_flight=single_flight, ttl=ttl)
     attr_name = "_{}".format(fn.__name__)
 
+    if not single_flight and ttl is None:
+        @wraps(fn)
+        def memoized(self):
+            """"memoized wraps"""
+            instrumentation = _instrumentation
+            if not hasattr(self, attr_name):
+                if instrumentation is not None:
+                    instrumentation.on_memoize(fn.__qualname__, False)
+                setattr(self, attr_name, fn(self))
+            elif instrumentation is not None:
+                instrumentation.on_memoize(fn.__qualname__, True)
+            return getattr(self, attr_name)
+
+        memoized.memoized_attr = attr_name
+        return property(memoized)
+
+    def cached(self) -> Any:
+        """The cached value, or _MISSING when absent or expired"""
+        value = getattr(self, attr_name, _MISSING)
+        if value is _MISSING or ttl is None:
+            return value
+        expires = self.__dict__.get(_EXPIRY, {}).get(attr_name)
+        if expires is not None and expires <= time.monotonic():
+            return _MISSING
+        return value
+
+    def compute(self) -> Any:
+        """Call fn and cache its value with a fresh expiry"""
+        return store(self, fn(self))
+
+    def store(self, value: Any) -> Any:
+        """Cache value with a fresh expiry"""
+        if ttl is not None:
+            seconds = ttl(self) if callable(ttl) else ttl
+            expires = None if seconds is None else time.monotonic() + seconds
+            self.__dict__.setdefault(_EXPIRY, {})[attr_name] = expires
+        setattr(self, attr_name, value)
+        return value
+
     @wraps(fn)
-    def memoized(self):
-        """"memoized wraps"""
-        if not hasattr(self, attr_name):
-            setattr(self, attr_name, fn(self))
-        return getattr(self, attr_name)
+    def memoized_with_options(self):
+        """"memoized wraps, honouring single_flight and ttl"""
+        instrumentation = _instrumentation
+        value = cached(self)
+        if value is not _MISSING:
+            if instrumentation is not None:
+                instrumentation.on_memoize(fn.__qualname__, True)
+            return value
+        if not single_flight:
+            value, hit = compute(self), False
+        else:
+            locks = self.__dict__.setdefault("_memoize_locks", {})
+            with locks.setdefault(attr_name, threading.Lock()):
+                value = cached(self)
+                hit = value is not _MISSING
+                if not hit:
+                    value = compute(self)
+        if instrumentation is not None:
+            instrumentation.on_memoize(fn.__qualname__, hit)
+        return value
+
+    memoized_with_options.memoized_attr = attr_name
+    memoized_with_options.memoized_cached = cached
+    memoized_with_options.memoized_store = store
+    return property(memoized_with_options)
+
 
-    return property(memoized)
\ No newline at end of file
+def _memoized_property(obj: Any, name: str) -> Callable:
+    """Getter behind the memoized property `name` of obj"""
+    fget = getattr(getattr(type(obj), name, None), "fget", None)
+    if getattr(fget, "memoized_attr", None) is None:
+        raise AttributeError(
+            "{!r} is not a memoized property of {}".format(
+                name, type(obj).__name__))
+    return fget
+
+
+def is_cached(obj: Any, name: str) -> bool:
+    """Whether the memoized property `name` holds an unexpired value"""
+    fget = _memoized_property(obj, name)
+    cached = getattr(fget, "memoized_cached", None)
+    if cached is None:
+        return hasattr(obj, fget.memoized_attr)
+    return cached(obj) is not _MISSING
+
+
+def prime(obj: Any, name: str, value: Any) -> None:
+    """Cache value in the memoized property `name` of obj as if it had
+    just been computed, restarting its TTL.
+    Example
+    -------
+    >>> prime(client, "org", {"repos_url": "..."})
+    """
+    fget = _memoized_property(obj, name)
+    store = getattr(fget, "memoized_store", None)
+    if store is None:
+        setattr(obj, fget.memoized_attr, value)
+    else:
+        store(obj, value)
+
+
+def invalidate(obj: Any, *names: str) -> None:
+    """Drop memoized values of obj so the next access recomputes them.
+    With no names, every memoized property of obj is dropped.
+    Example
+    -------
+    >>> invalidate(client, "repos_payload")
+    >>> invalidate(client)
+    """
+    if not names:
+        names = tuple(
+            name for name in dir(type(obj))
+            if getattr(getattr(getattr(type(obj), name), "fget", None),
+                       "memoized_attr", None) is not None)
+    for name in names:
+        attr_name = _memoized_property(obj, name).memoized_attr
+        obj.__dict__.pop(attr_name, None)
+        obj.__dict__.get(_EXPIRY, {}).pop(attr_name, None)